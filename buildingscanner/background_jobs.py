@@ -0,0 +1,149 @@
+"""
+Background jobs for the Tkinter app
+Slow PDF work runs on a worker thread; results are handed back to Tk via root.after
+"""
+
+import queue
+import threading
+from typing import Any, Callable, Dict, Optional
+
+POLL_INTERVAL_MS = 30
+
+
+class JobCancelled(BaseException):
+    """Raised inside a job once a newer job on the same channel replaced it
+
+    A BaseException, like KeyboardInterrupt, so the broad `except Exception`
+    handlers in the loading code don't swallow it.
+    """
+
+
+class Job:
+    """Handle passed to a running job function"""
+
+    def __init__(self, runner: 'JobRunner', channel: str, generation: int, func: Callable,
+                 on_done: Optional[Callable], on_error: Optional[Callable],
+                 on_progress: Optional[Callable]):
+        self.runner = runner
+        self.channel = channel
+        self.generation = generation
+        self.func = func
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_progress = on_progress
+
+    @property
+    def cancelled(self) -> bool:
+        """True once a newer job was submitted on the same channel"""
+        return self.runner.generation(self.channel) != self.generation
+
+    def check_cancelled(self):
+        """Raise JobCancelled if this job has been replaced"""
+        if self.cancelled:
+            raise JobCancelled()
+
+    def progress(self, *args):
+        """Report progress to the UI thread; also a cancellation point"""
+        self.check_cancelled()
+        if self.on_progress is not None:
+            self.runner.post(self, self.on_progress, *args)
+
+
+class JobRunner:
+    """Runs jobs one at a time on a single worker thread
+
+    One thread because PyMuPDF is not thread-safe: every job that touches
+    the BuildingManager goes through here, so documents are only used from
+    one thread at a time. Jobs are submitted on a named channel; submitting
+    a new job bumps the channel's generation, which skips the older job if
+    it hasn't started, stops it at its next progress() call, and drops its
+    result otherwise. Callbacks (on_done, on_error, on_progress) always run
+    on the Tk thread.
+    """
+
+    def __init__(self, root, poll_interval: int = POLL_INTERVAL_MS):
+        self.root = root
+        self.poll_interval = poll_interval
+        self._jobs: 'queue.Queue[Optional[Job]]' = queue.Queue()
+        self._results: 'queue.Queue[tuple]' = queue.Queue()
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._stopped = False
+
+        self._thread = threading.Thread(target=self._work, name="job-runner", daemon=True)
+        self._thread.start()
+        self._poll_id = self.root.after(self.poll_interval, self._poll)
+
+    def generation(self, channel: str) -> int:
+        """Current generation of a channel"""
+        with self._lock:
+            return self._generations.get(channel, 0)
+
+    def submit(self, channel: str, func: Callable[[Job], Any],
+               on_done: Optional[Callable[[Any], None]] = None,
+               on_error: Optional[Callable[[Exception], None]] = None,
+               on_progress: Optional[Callable] = None) -> Job:
+        """Queue func(job) on the worker thread, replacing older jobs on channel"""
+        with self._lock:
+            generation = self._generations.get(channel, 0) + 1
+            self._generations[channel] = generation
+        job = Job(self, channel, generation, func, on_done, on_error, on_progress)
+        self._jobs.put(job)
+        return job
+
+    def cancel(self, channel: str):
+        """Cancel the pending or running job on a channel, if any"""
+        with self._lock:
+            self._generations[channel] = self._generations.get(channel, 0) + 1
+
+    def post(self, job: Job, callback: Callable, *args):
+        """Schedule callback(*args) on the Tk thread, unless job is replaced by then"""
+        self._results.put((job, callback, args))
+
+    def _work(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            if job.cancelled:
+                continue
+            try:
+                result = job.func(job)
+            except JobCancelled:
+                continue
+            except Exception as e:
+                print(f"Background job on {job.channel} failed: {e}")
+                if job.on_error is not None:
+                    self.post(job, job.on_error, e)
+                continue
+            if job.on_done is not None:
+                self.post(job, job.on_done, result)
+
+    def _poll(self):
+        while True:
+            try:
+                job, callback, args = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if job.cancelled:
+                continue
+            try:
+                callback(*args)
+            except Exception as e:
+                # Keep polling: one failing callback must not drop every later result
+                print(f"Callback for {job.channel} failed: {e}")
+        if not self._stopped:
+            self._poll_id = self.root.after(self.poll_interval, self._poll)
+
+    def shutdown(self, timeout: Optional[float] = 5.0):
+        """Cancel all jobs and wait for the worker thread to finish"""
+        self._stopped = True
+        with self._lock:
+            for channel in self._generations:
+                self._generations[channel] += 1
+        self._jobs.put(None)
+        self._thread.join(timeout)
+        try:
+            self.root.after_cancel(self._poll_id)
+        except Exception:
+            pass
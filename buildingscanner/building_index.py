@@ -0,0 +1,264 @@
+"""
+Lookup indexes built once per loaded building
+"""
+
+import math
+import re
+from bisect import bisect_left
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+from floor_labels import Label, LabelTable
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Substrings that mark a floor as ground floor for entrance lookups
+GROUND_FLOOR_KEYWORDS = ('stue', 'ground', '0')
+
+# Each page of a multi-page plan PDF is a floor named <file>_p<page>
+PAGE_FLOOR_SUFFIX = re.compile(r'_p\d+$')
+
+# Rows per block in batch nearest-entrance queries, bounds the distance matrix
+BATCH_BLOCK_SIZE = 4096
+
+# (floor_name, row index into that floor's room table)
+RoomHit = Tuple[str, int]
+
+
+def normalize_room_query(query: str) -> str:
+    """Normalize a search string the same way room IDs are stored"""
+    return query.upper().strip()
+
+
+class RoomIndex:
+    """Exact and prefix lookup of room IDs across all floors of a building
+
+    Exact lookups are a dict access returning every (floor, index) hit in
+    floor order. Prefix lookups binary-search a sorted list of distinct IDs,
+    so both stay flat as buildings grow to thousands of labels.
+    """
+
+    def __init__(self, all_rooms: Dict[str, LabelTable]):
+        self._hits: Dict[str, List[RoomHit]] = {}
+        for floor_name, rooms in all_rooms.items():
+            for index, room_id in enumerate(rooms.ids):
+                self._hits.setdefault(room_id, []).append((floor_name, index))
+        self._sorted_ids = sorted(self._hits)
+
+    def __len__(self) -> int:
+        return len(self._sorted_ids)
+
+    def lookup(self, query: str) -> List[RoomHit]:
+        """All rooms whose ID equals the query"""
+        return self._hits.get(normalize_room_query(query), [])
+
+    def ids_with_prefix(self, prefix: str, limit: Optional[int] = None,
+                        candidates: Optional[List[str]] = None) -> List[str]:
+        """Sorted distinct IDs starting with prefix
+
+        candidates, if given, is an earlier unlimited result for a shorter
+        prefix of this one; only those IDs are searched.
+        """
+        prefix = normalize_room_query(prefix)
+        ids = self._sorted_ids if candidates is None else candidates
+        start = bisect_left(ids, prefix)
+
+        matches = []
+        for index in range(start, len(ids)):
+            room_id = ids[index]
+            if not room_id.startswith(prefix):
+                break
+            matches.append(room_id)
+            if limit is not None and len(matches) >= limit:
+                break
+        return matches
+
+    def hits_for_ids(self, room_ids: Sequence[str], limit: Optional[int] = None) -> List[RoomHit]:
+        """Hits for the given IDs, in that order"""
+        hits = []
+        for room_id in room_ids:
+            for hit in self._hits[room_id]:
+                hits.append(hit)
+                if limit is not None and len(hits) >= limit:
+                    return hits
+        return hits
+
+    def lookup_prefix(self, prefix: str, limit: Optional[int] = None) -> List[RoomHit]:
+        """Hits for every room whose ID starts with prefix, in ID order"""
+        return self.hits_for_ids(self.ids_with_prefix(prefix), limit)
+
+
+class IncrementalRoomSearch:
+    """Search-as-you-type over a RoomIndex
+
+    Remembers the IDs matching the previous query. When the next query
+    extends it (another character typed), only those IDs are searched
+    instead of the whole index; anything else starts over.
+    """
+
+    def __init__(self, index: RoomIndex):
+        self.index = index
+        self._prefix: Optional[str] = None
+        self._ids: List[str] = []
+
+    def update(self, query: str, limit: Optional[int] = None) -> List[RoomHit]:
+        """Hits for every room whose ID starts with query, in ID order"""
+        prefix = normalize_room_query(query)
+        if not prefix:
+            self._prefix = None
+            self._ids = []
+            return []
+
+        narrowing = self._prefix is not None and prefix.startswith(self._prefix)
+        self._ids = self.index.ids_with_prefix(prefix, candidates=self._ids if narrowing else None)
+        self._prefix = prefix
+        return self.index.hits_for_ids(self._ids, limit)
+
+
+def page_floor_name(file_floor_name: str, page_number: int) -> str:
+    """Floor name of one page (0-based) of a multi-page plan PDF"""
+    return f"{file_floor_name}_p{page_number + 1}"
+
+
+def is_ground_floor(floor_name: str) -> bool:
+    """Whether a floor name looks like a ground floor
+
+    Only the file's own name counts, so page 10 of a floor is not a
+    ground floor because of the 0 in its page suffix.
+    """
+    file_floor_name = PAGE_FLOOR_SUFFIX.sub('', floor_name)
+    return any(keyword in file_floor_name.lower() for keyword in GROUND_FLOOR_KEYWORDS)
+
+
+def entrance_floors(floor_names: Sequence[str]) -> List[str]:
+    """Floors whose entrances count: ground floors if any are recognizable, else all"""
+    ground_floors = [name for name in floor_names if is_ground_floor(name)]
+    return ground_floors if ground_floors else list(floor_names)
+
+
+def ground_floor_first(floor_names: Sequence[str]) -> List[str]:
+    """Floors in their own order, but with ground floors moved to the front"""
+    return sorted(floor_names, key=lambda name: not is_ground_floor(name))
+
+
+class EntranceIndex:
+    """Uniform grid over the entrances of a building, for nearest-entrance queries
+
+    Only entrances on the ground floor(s) are indexed (see entrance_floors),
+    matching the old get_nearest_entrance behaviour. Single and k-nearest
+    queries walk grid rings outwards from the query cell; batch queries
+    compute distances for many points at once with NumPy. Ties go to the
+    entrance that comes first in floor order, as before.
+    """
+
+    def __init__(self, all_entrances: Dict[str, LabelTable]):
+        self._labels: List[Tuple[LabelTable, int]] = []
+        xs = []
+        ys = []
+        for floor_name in entrance_floors(list(all_entrances)):
+            entrances = all_entrances[floor_name]
+            for index in range(len(entrances)):
+                self._labels.append((entrances, index))
+            xs.extend(entrances.xs)
+            ys.extend(entrances.ys)
+
+        count = len(self._labels)
+        if count:
+            # Imported here, not at module level, so the empty index built
+            # at app startup doesn't pull in NumPy
+            import numpy as np
+
+            self.xs = np.array(xs, dtype=np.float64)
+            self.ys = np.array(ys, dtype=np.float64)
+        else:
+            self.xs = self.ys = None
+
+        # About one entrance per cell, over the bounding box of the entrances
+        self._cells_per_axis = max(1, math.ceil(math.sqrt(count)))
+        self._min_x = min(xs) if count else 0.0
+        self._min_y = min(ys) if count else 0.0
+        extent = max(max(xs) - self._min_x, max(ys) - self._min_y) if count else 0.0
+        self._cell_size = (extent / self._cells_per_axis) or 1.0
+
+        self._cells: Dict[Tuple[int, int], List[int]] = {}
+        for point, (x, y) in enumerate(zip(xs, ys)):
+            self._cells.setdefault(self._cell_of(x, y), []).append(point)
+
+    def __len__(self) -> int:
+        return len(self._labels)
+
+    def label(self, point: int) -> Label:
+        """Entrance label for a point index returned by the batch query"""
+        entrances, index = self._labels[point]
+        return entrances[index]
+
+    def _cell_of(self, x: float, y: float) -> Tuple[int, int]:
+        last = self._cells_per_axis - 1
+        cx = int((x - self._min_x) / self._cell_size)
+        cy = int((y - self._min_y) / self._cell_size)
+        return min(max(cx, 0), last), min(max(cy, 0), last)
+
+    def _ring(self, cx: int, cy: int, radius: int):
+        """Grid cells at Chebyshev distance radius from (cx, cy)"""
+        if radius == 0:
+            yield cx, cy
+            return
+        for dx in range(-radius, radius + 1):
+            yield cx + dx, cy - radius
+            yield cx + dx, cy + radius
+        for dy in range(-radius + 1, radius):
+            yield cx - radius, cy + dy
+            yield cx + radius, cy + dy
+
+    def k_nearest(self, x: float, y: float, k: int = 1) -> List[Label]:
+        """Up to k entrances closest to (x, y), nearest first"""
+        if k <= 0 or not self._labels:
+            return []
+        k = min(k, len(self._labels))
+
+        cx, cy = self._cell_of(x, y)
+        candidates: List[Tuple[float, int]] = []
+        radius = 0
+        while True:
+            for cell in self._ring(cx, cy, radius):
+                for point in self._cells.get(cell, ()):
+                    dx = self.xs[point] - x
+                    dy = self.ys[point] - y
+                    candidates.append((dx * dx + dy * dy, point))
+
+            # Anything not yet seen is in a cell at least radius cells away
+            bound = radius * self._cell_size
+            candidates.sort()
+            covered = radius >= self._cells_per_axis
+            if covered or (len(candidates) >= k and candidates[k - 1][0] <= bound * bound):
+                break
+            radius += 1
+
+        return [self.label(point) for _, point in candidates[:k]]
+
+    def nearest(self, x: float, y: float) -> Optional[Label]:
+        """Closest entrance to (x, y), or None if the building has none"""
+        nearest = self.k_nearest(x, y, 1)
+        return nearest[0] if nearest else None
+
+    def nearest_batch(self, xs, ys) -> 'np.ndarray':
+        """Index of the closest entrance for every (x, y) pair, -1 if there are none
+
+        xs and ys may be any sequences of floats, including the array('d')
+        columns of a LabelTable, which NumPy reads without copying.
+        """
+        import numpy as np
+
+        query_xs = np.asarray(xs, dtype=np.float64)
+        query_ys = np.asarray(ys, dtype=np.float64)
+        result = np.full(len(query_xs), -1, dtype=np.intp)
+        if not self._labels:
+            return result
+
+        for start in range(0, len(query_xs), BATCH_BLOCK_SIZE):
+            block = slice(start, start + BATCH_BLOCK_SIZE)
+            dx = query_xs[block, None] - self.xs[None, :]
+            dy = query_ys[block, None] - self.ys[None, :]
+            # argmin returns the first minimum, so ties keep floor order
+            result[block] = np.argmin(dx * dx + dy * dy, axis=1)
+        return result
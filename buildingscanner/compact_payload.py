@@ -0,0 +1,206 @@
+"""Compact, columnar form of buildings.json.
+
+The default payload stores every room as an object with full-precision
+floats and the PDF font sizes, which the app never reads. The compact form
+(opt in with export_building_data.py --compact) keeps the same
+buildings/<building>/floors/<floor> tree, but each floor's rooms and
+entrances become parallel arrays:
+
+    {
+      "format": "compact", "version": 1, "coordScale": 10000,
+      "buildings": {"<b>": {"originalName": ..., "floors": {"<f>": {
+        "originalName": ..., "image": ..., (tiles/vector/variants as before)
+        "rooms": {"id": [...], "text": [...], "x": [...], "y": [...]},
+        "entrances": {"text": [...], "x": [...], "y": [...]}
+      }}}}
+    }
+
+x and y are integers in [0, coordScale]; 1/10000 of the plan is well below
+a pixel on any floor image. A room text equal to its id is stored as "".
+Empty strings survive Firebase, but null array entries do not.
+The JSON is written without whitespace, optionally with a gzip or brotli
+sidecar for static hosting. expand_payload() reads either form.
+"""
+
+import gzip
+import json
+import os
+import shutil
+from typing import Any, Dict, List, Optional
+
+COMPACT_FORMAT = "compact"
+COMPACT_VERSION = 1
+DEFAULT_COORD_SCALE = 10000
+
+SIDECARS = {
+    "gzip": ".gz",
+    "brotli": ".br",
+}
+
+
+def _columns(points: List[Dict[str, Any]], scale: int, with_id: bool) -> Dict[str, List[Any]]:
+    columns: Dict[str, List[Any]] = {"id": []} if with_id else {}
+    columns.update({"text": [], "x": [], "y": []})
+    for point in points:
+        text = point.get("text", "")
+        if with_id:
+            columns["id"].append(point["id"])
+            text = "" if text == point["id"] else text
+        columns["text"].append(text)
+        columns["x"].append(round(point["x"] * scale))
+        columns["y"].append(round(point["y"] * scale))
+    return columns
+
+
+def _rows(columns: Optional[Dict[str, List[Any]]], scale: int, with_id: bool) -> List[Dict[str, Any]]:
+    if not columns:
+        # Firebase drops empty arrays and objects
+        return []
+    ids = columns.get("id") or []
+    texts = columns.get("text") or []
+    xs = columns.get("x") or []
+    ys = columns.get("y") or []
+    rows = []
+    for index in range(len(xs)):
+        text = texts[index] if index < len(texts) else ""
+        row: Dict[str, Any] = {}
+        if with_id:
+            row["id"] = ids[index]
+            text = text or ids[index]
+        row["text"] = text
+        row["x"] = xs[index] / scale
+        row["y"] = ys[index] / scale
+        rows.append(row)
+    return rows
+
+
+def is_compact(data: Dict[str, Any]) -> bool:
+    return data.get("format") == COMPACT_FORMAT
+
+
+def compact_header(coord_scale: int = DEFAULT_COORD_SCALE) -> Dict[str, Any]:
+    """Top-level keys of a compact payload other than buildings"""
+    return {"format": COMPACT_FORMAT, "version": COMPACT_VERSION, "coordScale": coord_scale}
+
+
+def compact_building(building: Dict[str, Any], coord_scale: int = DEFAULT_COORD_SCALE) -> Dict[str, Any]:
+    """Compact form of one building's payload"""
+    floors = {}
+    for floor_slug, floor in building["floors"].items():
+        floors[floor_slug] = {
+            **floor,
+            "rooms": _columns(floor.get("rooms", []), coord_scale, with_id=True),
+            "entrances": _columns(floor.get("entrances", []), coord_scale, with_id=False),
+        }
+    return {**building, "floors": floors}
+
+
+def compact_payload(data: Dict[str, Any], coord_scale: int = DEFAULT_COORD_SCALE) -> Dict[str, Any]:
+    """Compact form of an exported buildings payload"""
+    buildings = {building_slug: compact_building(building, coord_scale)
+                 for building_slug, building in data["buildings"].items()}
+    return {**compact_header(coord_scale), "buildings": buildings}
+
+
+def expand_payload(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Payload with rooms and entrances as lists of dicts, from either form
+
+    Font sizes are not part of the compact form, so they are missing from
+    rooms read from it.
+    """
+    if not is_compact(data):
+        return data
+    if data.get("version") != COMPACT_VERSION:
+        raise ValueError(f"Unsupported compact buildings payload version: {data.get('version')}")
+
+    scale = data["coordScale"]
+    buildings = {}
+    for building_slug, building in (data.get("buildings") or {}).items():
+        floors = {}
+        for floor_slug, floor in (building.get("floors") or {}).items():
+            floors[floor_slug] = {
+                **floor,
+                "rooms": _rows(floor.get("rooms"), scale, with_id=True),
+                "entrances": _rows(floor.get("entrances"), scale, with_id=False),
+            }
+        buildings[building_slug] = {**building, "floors": floors}
+    return {"buildings": buildings}
+
+
+def encode_payload(data: Dict[str, Any]) -> bytes:
+    """Payload as JSON bytes; compact payloads are written without whitespace"""
+    if is_compact(data):
+        return json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
+
+
+class BuildingsJsonWriter:
+    """Writes a buildings payload one building at a time
+
+    The bytes are the same as encode_payload() of the whole payload, but
+    only one building is held in memory. Output goes to a temporary file
+    next to path; close() returns its path, and the caller moves it into
+    place.
+    """
+
+    def __init__(self, path: str, header: Optional[Dict[str, Any]] = None):
+        self.path = path
+        self.header = header or {}
+        self.compact = self.header.get("format") == COMPACT_FORMAT
+        self.tmp_path = f"{path}.{os.getpid()}.tmp"
+        self.count = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(self.tmp_path, "w", encoding="utf-8")
+        if self.compact:
+            # The header object without its closing brace
+            self._file.write(json.dumps(self.header, separators=(",", ":"), ensure_ascii=False)[:-1])
+            self._file.write(',"buildings":{')
+        else:
+            self._file.write('{\n  "buildings": {')
+
+    def add(self, building_slug: str, building: Dict[str, Any]):
+        """Append one building"""
+        key = json.dumps(building_slug, ensure_ascii=False)
+        if self.compact:
+            value = json.dumps(building, separators=(",", ":"), ensure_ascii=False)
+            self._file.write(f'{"," if self.count else ""}{key}:{value}')
+        else:
+            # Same indentation as the building nested two levels deep in json.dumps(indent=2)
+            value = json.dumps(building, indent=2, ensure_ascii=False).replace("\n", "\n    ")
+            self._file.write(f'{"," if self.count else ""}\n    {key}: {value}')
+        self.count += 1
+
+    def close(self) -> str:
+        """Finish the document; returns the temporary file's path"""
+        if self.compact:
+            self._file.write("}}")
+        else:
+            self._file.write("\n  }\n}" if self.count else "}\n}")
+        self._file.close()
+        return self.tmp_path
+
+    def abort(self):
+        """Discard the partial output"""
+        self._file.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+def compress_sidecar_file(src_path: str, dst_path: str, codec: str):
+    """Write the gzip or brotli encoding of a file, in chunks, reproducible byte for byte"""
+    if codec not in SIDECARS:
+        raise ValueError(f"Unknown sidecar codec: {codec}")
+    if codec == "gzip":
+        with open(src_path, "rb") as src, open(dst_path, "wb") as raw, \
+                gzip.GzipFile(filename="", mode="wb", fileobj=raw, compresslevel=9, mtime=0) as dst:
+            shutil.copyfileobj(src, dst)
+        return
+    try:
+        import brotli
+    except ImportError:
+        raise RuntimeError("brotli sidecar requested but the brotli package is not installed")
+    compressor = brotli.Compressor(quality=11)
+    with open(src_path, "rb") as src, open(dst_path, "wb") as dst:
+        for chunk in iter(lambda: src.read(1024 * 1024), b""):
+            dst.write(compressor.process(chunk))
+        dst.write(compressor.finish())
@@ -6,9 +6,10 @@ Shows all text found in PDFs to help debug room detection
 
 import sys
 import os
+import re
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from pdf_parser import PDFParser
+from pdf_parser import PDFParser, ROOM, ENTRANCE, iter_spans
 
 def analyze_pdf(pdf_path, floor_name):
     """Analyze a single PDF file"""
@@ -25,38 +26,24 @@ def analyze_pdf(pdf_path, floor_name):
     try:
         # Get text content with detailed analysis
         page = parser.doc[0]
-        text_dict = page.get_text("dict")
+        spans = list(iter_spans(page))
         
-        all_texts = []
+        # Calculate normalized font size (same logic as in parser)
+        page_rect = page.rect
+        reference_size = 595 * 842
+        actual_size = page_rect.width * page_rect.height
+        size_scale_factor = (actual_size / reference_size) ** 0.5
         
-        for block in text_dict["blocks"]:
-            if "lines" not in block:
-                continue
-                
-            for line in block["lines"]:
-                for span in line["spans"]:
-                    text = span["text"].strip()
-                    if not text:
-                        continue
-                        
-                    font_size = span["size"]
-                    bbox = span["bbox"]
-                    
-                    # Calculate normalized font size (same logic as in parser)
-                    page_rect = page.rect
-                    reference_size = 595 * 842
-                    actual_size = page_rect.width * page_rect.height
-                    size_scale_factor = (actual_size / reference_size) ** 0.5
-                    normalized_font_size = font_size / size_scale_factor
-                    
-                    all_texts.append({
-                        'text': text,
-                        'font_size': font_size,
-                        'normalized_font_size': normalized_font_size,
-                        'bbox': bbox,
-                        'is_room': parser.is_room_text(text, font_size, normalized_font_size),
-                        'is_entrance': parser.is_entrance_text(text)
-                    })
+        all_texts = []
+        for (text, font_size, bbox), label in zip(spans, parser.classify_spans(spans)):
+            all_texts.append({
+                'text': text,
+                'font_size': font_size,
+                'normalized_font_size': font_size / size_scale_factor,
+                'bbox': bbox,
+                'is_room': label == ROOM,
+                'is_entrance': label == ENTRANCE
+            })
         
         # Sort by font size (largest first)
         all_texts.sort(key=lambda x: x['font_size'], reverse=True)
@@ -99,6 +86,100 @@ def analyze_pdf(pdf_path, floor_name):
     finally:
         parser.close()
 
+def legacy_is_room_text(text, font_size=0):
+    """Original rule-by-rule room check, kept as the reference for verify_classifier()"""
+    if not text or len(text) < 1:
+        return False
+    
+    if not (3.2 <= font_size <= 3.6 or 49.0 <= font_size <= 49.4):
+        return False
+        
+    if re.match(r'^\d+\.\d+m2$', text, re.IGNORECASE):
+        return False
+    if re.match(r'^(Area|Type|Room \d+\.\d+m2):', text, re.IGNORECASE):
+        return False
+    if re.match(r'^\d+\.\d+$', text) and len(text) > 6:
+        return False
+    if re.match(r'^(width|height|scale|rotation|metadata|properties)$', text, re.IGNORECASE):
+        return False
+    
+    if re.match(r'^[A-Z0-9]{1,4}[-._][A-Z0-9]{1,4}', text, re.IGNORECASE):
+        return True
+    if re.match(r'^\d{2}_\d{2}$', text):
+        return True
+    if re.match(r'^[A-Z]\.\d\.\d{2}$', text, re.IGNORECASE):
+        return True
+    if re.match(r'^PH-D\d+\.?\d*_?\d*$', text, re.IGNORECASE):
+        return True
+    if re.match(r'^[A-Z]{1,2}\d{2,4}$', text, re.IGNORECASE):
+        return True
+    if re.match(r'^\d{2,4}[A-Z]?$', text, re.IGNORECASE):
+        return True
+    if re.match(r'^[A-Z0-9]{2,8}$', text, re.IGNORECASE):
+        return True
+    
+    if re.match(r'^[A-Z0-9.-_]{2,10}$', text, re.IGNORECASE):
+        if not re.match(r'^[\d.]+$', text):
+            return True
+        
+    return False
+
+
+def iter_building_pdfs(bygninger_dir):
+    """Yield (building_name, floor_name, pdf_path) for every PDF in bygninger/"""
+    for building_name in os.listdir(bygninger_dir):
+        building_path = os.path.join(bygninger_dir, building_name)
+        if not os.path.isdir(building_path):
+            continue
+        
+        pdf_files = sorted(f for f in os.listdir(building_path) if f.endswith('.pdf'))
+        for filename in pdf_files:
+            floor_name = os.path.splitext(filename)[0]  # Remove .pdf extension
+            yield building_name, floor_name, os.path.join(building_path, filename)
+
+
+def verify_classifier(bygninger_dir):
+    """Check that classify_spans() agrees with the original rules on every span
+    
+    Every span is checked at its own font size and at a room font size, so
+    the label patterns are compared even for text the size gate would reject.
+    Returns the number of mismatches.
+    """
+    mismatches = 0
+    checked = 0
+    
+    for building_name, floor_name, pdf_path in iter_building_pdfs(bygninger_dir):
+        parser = PDFParser(pdf_path)
+        if not parser.load_pdf():
+            print(f"❌ Failed to load {pdf_path}")
+            mismatches += 1
+            continue
+        
+        try:
+            spans = []
+            for text, font_size, bbox in iter_spans(parser.doc[0]):
+                spans.append((text, font_size, bbox))
+                spans.append((text, 3.4, bbox))
+            
+            for (text, font_size, _), label in zip(spans, parser.classify_spans(spans)):
+                if parser.is_entrance_text(text):
+                    expected = ENTRANCE
+                elif legacy_is_room_text(text, font_size):
+                    expected = ROOM
+                else:
+                    expected = None
+                
+                checked += 1
+                if label != expected:
+                    mismatches += 1
+                    print(f"❌ {building_name}/{floor_name}: '{text}' size {font_size:.2f} -> {label}, expected {expected}")
+        finally:
+            parser.close()
+    
+    print(f"Checked {checked} spans, {mismatches} mismatches")
+    return mismatches
+
+
 def main():
     """Main debug function"""
     print("🔍 PDF Text Analysis Debug Tool")
@@ -111,29 +192,19 @@ def main():
         print(f"❌ Error: bygninger directory not found at {bygninger_dir}")
         return
     
+    if "--verify-classifier" in sys.argv[1:]:
+        sys.exit(1 if verify_classifier(bygninger_dir) else 0)
+    
     # Scan all buildings
-    for building_name in os.listdir(bygninger_dir):
-        building_path = os.path.join(bygninger_dir, building_name)
-        
-        if os.path.isdir(building_path):
+    current_building = None
+    for building_name, floor_name, pdf_path in iter_building_pdfs(bygninger_dir):
+        if building_name != current_building:
+            current_building = building_name
             print(f"\n{'='*80}")
             print(f"BUILDING: {building_name.upper()}")
             print(f"{'='*80}")
-            
-            # Get all PDF files in building
-            pdf_files = [f for f in os.listdir(building_path) if f.endswith('.pdf')]
-            
-            if not pdf_files:
-                print(f"❌ No PDF files found in {building_name}")
-                continue
-                
-            pdf_files.sort()
-            
-            for filename in pdf_files:
-                pdf_path = os.path.join(building_path, filename)
-                floor_name = os.path.splitext(filename)[0]  # Remove .pdf extension
-                
-                analyze_pdf(pdf_path, floor_name)
+        
+        analyze_pdf(pdf_path, floor_name)
     
     print(f"\n{'='*60}")
     print("Analysis complete!")
@@ -1,7 +1,9 @@
 """Export building PDF data to assets and JSON for the React Native app.
 
 Features added:
-- Optional push to Firebase Realtime Database via REST API.
+- Optional push to Firebase Realtime Database via REST API. Only paths that
+  changed since the last push are sent (see firebase_sync); --full-push
+  rewrites the whole tree.
 
 Usage examples:
     # just export to local app assets/data
@@ -14,21 +16,59 @@ Usage examples:
 from __future__ import annotations
 
 import argparse
+import functools
+import io
 import json
 import os
 import re
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Any, Optional
-
-import requests
-
-from pdf_parser import BuildingManager
+from typing import Callable, Dict, Any, Iterator, List, Optional, Sequence, Tuple
+
+from compact_payload import (
+    DEFAULT_COORD_SCALE,
+    SIDECARS,
+    BuildingsJsonWriter,
+    compact_building,
+    compact_header,
+    compress_sidecar_file,
+)
+from export_manifest import ExportManifest
+from extraction_cache import ExtractionCache
+from firebase_sync import RETRY_ATTEMPTS, push_admin, push_delta, push_rest
+from image_variants import (
+    DEFAULT_BASE_DIMENSION,
+    DEFAULT_DENSITIES,
+    DEFAULT_ENCODE_SETTINGS,
+    DEFAULT_FORMATS,
+    FORMAT_EXTENSIONS,
+    export_image_variants,
+)
+from pdf_parser import CLASSIFIER_VERSION, BuildingManager
+from raster_compression import (
+    DEFAULT_BYTE_BUDGET,
+    DEFAULT_MAX_COLORS,
+    DEFAULT_MIN_SCALE,
+    encode_floor_image,
+)
+from sharded_export import SHARD_MODES, ShardWriter
+from tile_pyramid import DEFAULT_MAX_DIMENSION, DEFAULT_TILE_SIZE, close_tile_documents, export_tile_pyramid
+from vector_plan import DEFAULT_GRID, DEFAULT_TOLERANCE, export_vector_plan
 
 ROOT = Path(__file__).resolve().parent
 BUILDINGS_DIR = ROOT / "bygninger"
 OUTPUT_DIR = ROOT / "wayinreact"
 ASSETS_DIR = OUTPUT_DIR / "assets"
 DATA_DIR = OUTPUT_DIR / "src" / "data"
+SHARDS_DIR = DATA_DIR / "shards"
+VARIANTS_REPORT = ROOT / ".cache" / "image_variants_report.json"
+COMPRESSION_REPORT = ROOT / ".cache" / "raster_compression_report.json"
+EXPORT_MANIFEST = ROOT / ".cache" / "export_manifest.json"
+PUSH_SNAPSHOT = ROOT / ".cache" / "firebase_snapshot.json"
+
+# Scale of the floor PNG render
+FLOOR_IMAGE_SCALE = 2.0
 
 
 def slugify(value: str) -> str:
@@ -41,14 +81,106 @@ def ensure_dirs(path: Path) -> None:
     path.mkdir(parents=True, exist_ok=True)
 
 
-def export_buildings() -> Dict[str, Any]:
-    manager = BuildingManager(str(BUILDINGS_DIR))
+def export_buildings(**options) -> Dict[str, Any]:
+    """Export every building and return the whole payload; see iter_export_buildings"""
+    return {"buildings": dict(iter_export_buildings(**options))}
+
+
+def iter_export_buildings(
+    max_workers: int = 1,
+    cache: Optional[ExtractionCache] = None,
+    tiles: bool = False,
+    tile_size: int = DEFAULT_TILE_SIZE,
+    tile_max_dimension: int = DEFAULT_MAX_DIMENSION,
+    variants: bool = False,
+    variant_densities: Sequence[int] = DEFAULT_DENSITIES,
+    variant_formats: Sequence[str] = DEFAULT_FORMATS,
+    variant_base_dimension: int = DEFAULT_BASE_DIMENSION,
+    encode_settings: Optional[Dict[str, Any]] = None,
+    variants_report: Path = VARIANTS_REPORT,
+    vector: bool = False,
+    vector_grid: int = DEFAULT_GRID,
+    vector_tolerance: float = DEFAULT_TOLERANCE,
+    vector_labels: bool = False,
+    compress: bool = False,
+    byte_budget: Optional[int] = DEFAULT_BYTE_BUDGET,
+    compress_max_colors: int = DEFAULT_MAX_COLORS,
+    dither: bool = False,
+    min_scale: float = DEFAULT_MIN_SCALE,
+    compression_report: Path = COMPRESSION_REPORT,
+    manifest: Optional[ExportManifest] = None,
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Export building by building, yielding (building slug, payload) as each one finishes
+
+    A building's documents and labels are released before the next one is
+    loaded, so memory is bounded by the largest building, not the whole
+    campus, as long as the caller doesn't keep the payloads either.
+    """
+    # Lazy extraction: with a manifest, only floors whose PDF changed are extracted
+    manager = BuildingManager(str(BUILDINGS_DIR), max_workers=max_workers, cache=cache,
+                              lazy_extraction=True)
     buildings = manager.get_available_buildings()
-    exported: Dict[str, Any] = {"buildings": {}}
 
     if not buildings:
         raise RuntimeError(f"No buildings found in {BUILDINGS_DIR}")
 
+    # One pool for all tile renders; PyMuPDF needs processes, not threads
+    tile_executor = ProcessPoolExecutor(max_workers=max_workers) if tiles and max_workers > 1 else None
+    # Image variants are resized and encoded by Pillow, which releases the GIL
+    encode_executor = ThreadPoolExecutor(max_workers=max_workers) if variants and max_workers > 1 else None
+    variant_options = None
+    if variants:
+        variant_options = {
+            "densities": sorted(set(variant_densities)),
+            "formats": list(variant_formats),
+            "base_dimension": variant_base_dimension,
+            "settings": {**DEFAULT_ENCODE_SETTINGS, **(encode_settings or {})},
+            "executor": encode_executor,
+        }
+    vector_options = None
+    if vector:
+        vector_options = {"grid": vector_grid, "tolerance": vector_tolerance, "labels": vector_labels}
+    compress_options = None
+    if compress:
+        compress_options = {"byte_budget": byte_budget, "max_colors": compress_max_colors,
+                            "dither": dither, "min_scale": min_scale}
+    report: List[Dict[str, Any]] = []
+    compressed: List[Dict[str, Any]] = []
+    vectors: List[Dict[str, Any]] = []
+    try:
+        yield from _iter_buildings(manager, buildings, tiles, tile_size, tile_max_dimension, tile_executor,
+                                   variant_options, report, vector_options, vectors, compress_options, compressed,
+                                   manifest)
+    finally:
+        manager.close_all()
+        if tile_executor is not None:
+            tile_executor.shutdown()
+        if encode_executor is not None:
+            encode_executor.shutdown()
+
+    if variants:
+        write_variants_report(report, variant_options, variants_report)
+    if compress:
+        write_compression_report(compressed, compress_options, compression_report)
+    if vector:
+        print_vector_summary(vectors)
+
+
+def _iter_buildings(
+    manager: BuildingManager,
+    buildings: List[str],
+    tiles: bool,
+    tile_size: int,
+    tile_max_dimension: int,
+    tile_executor: Optional[ProcessPoolExecutor],
+    variant_options: Optional[Dict[str, Any]],
+    report: List[Dict[str, Any]],
+    vector_options: Optional[Dict[str, Any]],
+    vectors: List[Dict[str, Any]],
+    compress_options: Optional[Dict[str, Any]],
+    compressed: List[Dict[str, Any]],
+    manifest: Optional[ExportManifest],
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
     for building in buildings:
         if not manager.load_building_floors(building):
             print(f"Skipping {building}: failed to load floors")
@@ -58,42 +190,244 @@ def export_buildings() -> Dict[str, Any]:
         building_assets_dir = ASSETS_DIR / building_slug
         ensure_dirs(building_assets_dir)
 
+        # Floors whose PDF is unchanged since the last export keep their payload
+        reused: Dict[str, Dict[str, Any]] = {}
+        if manifest is not None:
+            for floor_name, parser in manager.floors.items():
+                payload = manifest.unchanged_floor(parser.pdf_path, parser.page_number)
+                if payload is not None:
+                    reused[floor_name] = payload
+        # Extract the rest in one batch, so they still go through the process pool
+        manager.ensure_floors_extracted([floor_name for floor_name in manager.floors if floor_name not in reused])
+
         floors_payload: Dict[str, Any] = {}
         for floor_name, parser in manager.floors.items():
             floor_slug = slugify(floor_name)
+            if floor_name in reused:
+                print(f"  = {building}/{floor_name} unchanged, reusing previous export")
+                floors_payload[floor_slug] = reused[floor_name]
+                # Keep the reports complete, not just the floors re-exported this run
+                reports = manifest.floor_reports(parser.pdf_path, parser.page_number)
+                compressed.extend(reports.get("compression", []))
+                report.extend(reports.get("variants", []))
+                vectors.extend(reports.get("vector", []))
+                continue
+            compressed_start, report_start, vectors_start = len(compressed), len(report), len(vectors)
+            # Every file of this floor goes through the manifest and is listed with the floor
+            outputs: List[str] = []
+            write = functools.partial(_write_floor_output, manifest, outputs)
+
+            rooms, entrances = manager.get_floor_labels(floor_name)
             image_path = building_assets_dir / f"{floor_slug}.png"
 
-            image = parser.render_pdf_as_image(scale=2.0)
+            image = parser.render_pdf_as_image(scale=FLOOR_IMAGE_SCALE)
             if image is None:
                 print(f"  ! Skipping image export for {building}/{floor_name}: render failed")
                 continue
 
-            image.save(image_path)
+            if compress_options is not None:
+                data, row = encode_floor_image(image, **compress_options)
+                row.update({"file": image_path.name, "building": building_slug, "floor": floor_slug})
+                compressed.append(row)
+            else:
+                buffer = io.BytesIO()
+                image.save(buffer, "PNG")
+                data = buffer.getvalue()
+            write(data, str(image_path))
+            png_bytes = len(data)
+            # The full-size bitmap isn't needed for tiles, vectors or variants
+            del image, data
 
             floors_payload[floor_slug] = {
                 "originalName": floor_name,
                 "image": f"{building_slug}/{floor_slug}.png",
-                "rooms": manager.all_rooms.get(floor_name, []),
-                "entrances": manager.all_entrances.get(floor_name, []),
+                "rooms": rooms.to_dicts(),
+                "entrances": entrances.to_dicts(),
             }
 
-        exported["buildings"][building_slug] = {
+            if tiles:
+                tiles_dir = building_assets_dir / f"{floor_slug}_tiles"
+                print(f"  Rendering tile pyramid for {building}/{floor_name}")
+                export_tile_pyramid(
+                    parser.pdf_path,
+                    str(tiles_dir),
+                    page_number=parser.page_number,
+                    tile_size=tile_size,
+                    max_dimension=tile_max_dimension,
+                    executor=tile_executor,
+                    write=write,
+                )
+                floors_payload[floor_slug]["tiles"] = f"{building_slug}/{floor_slug}_tiles/manifest.json"
+
+            if vector_options is not None:
+                print(f"  Writing vector plan for {building}/{floor_name}")
+                # Only worth shipping when it is smaller than the PNG it stands in for
+                stats = export_vector_plan(parser, str(building_assets_dir / f"{floor_slug}.svg"),
+                                           max_bytes=png_bytes, write=write, **vector_options)
+                vectors.append({"building": building_slug, "floor": floor_slug, "bytes": stats["bytes"],
+                                "pngBytes": png_bytes, "written": stats["written"]})
+                if stats["written"]:
+                    floors_payload[floor_slug]["vector"] = f"{building_slug}/{floor_slug}.svg"
+
+            if variant_options is not None:
+                floors_payload[floor_slug]["variants"] = _export_floor_variants(
+                    parser, building, floor_name, building_slug, floor_slug, variant_options, report, write)
+
+            if manifest is not None:
+                # Round-trip through JSON so a reused payload is identical to a fresh one
+                manifest.record_floor(parser.pdf_path, parser.page_number,
+                                      json.loads(json.dumps(floors_payload[floor_slug])),
+                                      {"compression": compressed[compressed_start:],
+                                       "variants": report[report_start:],
+                                       "vector": vectors[vectors_start:]},
+                                      outputs)
+
+        # Close the PDFs and drop the labels before the caller serializes the payload
+        manager.release_building()
+        if tile_executor is None:
+            close_tile_documents()
+        yield building_slug, {
             "originalName": building,
             "floors": floors_payload,
         }
 
-        manager.close_all()
 
-    return exported
+def _write_floor_output(manifest: Optional[ExportManifest], outputs: List[str], data: bytes, path: str) -> None:
+    """write_bytes for one floor's files, remembering their paths"""
+    write_bytes(data, Path(path), manifest)
+    outputs.append(path)
+
+
+def _export_floor_variants(
+    parser,
+    building: str,
+    floor_name: str,
+    building_slug: str,
+    floor_slug: str,
+    options: Dict[str, Any],
+    report: List[Dict[str, Any]],
+    write: Callable[[bytes, str], None],
+) -> Dict[str, Dict[str, str]]:
+    """Render a floor once at the top density and write all its variants"""
+    top_dimension = options["base_dimension"] * max(options["densities"])
+    print(f"  Encoding image variants for {building}/{floor_name}")
+    start = time.perf_counter()
+    image = parser.render_pdf_as_image(target_size=(top_dimension, top_dimension),
+                                       max_dimension=top_dimension)
+    render_seconds = time.perf_counter() - start
+    if image is None:
+        print(f"  ! Skipping image variants for {building}/{floor_name}: render failed")
+        return {}
+
+    files, rows = export_image_variants(
+        image,
+        str(ASSETS_DIR / building_slug / "variants"),
+        floor_slug,
+        densities=options["densities"],
+        formats=options["formats"],
+        settings=options["settings"],
+        executor=options["executor"],
+        write=write,
+    )
+    for row in rows:
+        row.update({"building": building_slug, "floor": floor_slug,
+                    "renderSeconds": round(render_seconds, 4)})
+    report.extend(rows)
+
+    return {fmt: {density: f"{building_slug}/variants/{name}" for density, name in by_density.items()}
+            for fmt, by_density in files.items()}
+
+
+def write_variants_report(report: List[Dict[str, Any]], options: Dict[str, Any], path: Path) -> None:
+    """Write per-file sizes and encode times, and print totals per format"""
+    totals: Dict[str, Dict[str, Any]] = {}
+    for row in report:
+        total = totals.setdefault(row["format"], {"files": 0, "bytes": 0, "encodeSeconds": 0.0})
+        total["files"] += 1
+        total["bytes"] += row["bytes"]
+        total["encodeSeconds"] = round(total["encodeSeconds"] + row["encodeSeconds"], 4)
+
+    write_json({
+        "densities": options["densities"],
+        "baseDimension": options["base_dimension"],
+        "settings": options["settings"],
+        "totals": totals,
+        "files": report,
+    }, path)
+
+    print(f"Image variants report written to {path}")
+    for fmt, total in totals.items():
+        print(f"  {fmt:>5}: {total['files']} files, {total['bytes'] / 1024:.0f} KiB, "
+              f"{total['encodeSeconds']:.2f}s encoding")
+
+
+def write_compression_report(rows: List[Dict[str, Any]], options: Dict[str, Any], path: Path) -> None:
+    """Write per-floor compression results, and print the total savings"""
+    baseline = sum(row["baselineBytes"] for row in rows)
+    total = sum(row["bytes"] for row in rows)
+    over_budget = [f"{row['building']}/{row['floor']}" for row in rows if not row["withinBudget"]]
+
+    write_json({
+        "settings": options,
+        "baselineBytes": baseline,
+        "bytes": total,
+        "savedBytes": baseline - total,
+        "overBudget": over_budget,
+        "floors": rows,
+    }, path)
+
+    saved = 100 * (baseline - total) / baseline if baseline else 0.0
+    print(f"Compressed {len(rows)} floor images: {baseline / 1024:.0f} KiB -> {total / 1024:.0f} KiB "
+          f"({saved:.0f}% smaller); report written to {path}")
+    if over_budget:
+        print(f"  ! Over the byte budget even at the minimum scale: {', '.join(over_budget)}")
+
+
+def print_vector_summary(rows: List[Dict[str, Any]]) -> None:
+    """Print how the SVG plans compare to the PNGs"""
+    written = [row for row in rows if row["written"]]
+    skipped = [f"{row['building']}/{row['floor']}" for row in rows if not row["written"]]
+    svg_total = sum(row["bytes"] for row in written)
+    png_total = sum(row["pngBytes"] for row in written)
+    print(f"Wrote {len(written)} vector plans: {svg_total / 1024:.0f} KiB SVG vs {png_total / 1024:.0f} KiB PNG")
+    if skipped:
+        print(f"  ! Not smaller than the PNG, no vector plan: {', '.join(skipped)}")
+
+
+def write_bytes(data: bytes, path: Path, manifest: Optional[ExportManifest] = None) -> None:
+    """Write an output file; with a manifest, byte-identical files are left alone"""
+    if manifest is not None:
+        manifest.write_if_changed(str(path), data)
+        return
+    ensure_dirs(path.parent)
+    path.write_bytes(data)
 
 
-def write_json(data: Dict[str, Any], path: Path) -> None:
-    ensure_dirs(path.parent)
-    with path.open("w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+def commit_file(tmp_path: str, path: Path, manifest: Optional[ExportManifest] = None,
+                sidecars: Sequence[str] = ()) -> None:
+    """Move a streamed output into place, plus a compressed copy per sidecar codec"""
+    for codec in sidecars:
+        sidecar_path = path.with_name(path.name + SIDECARS[codec])
+        sidecar_tmp = f"{sidecar_path}.{os.getpid()}.tmp"
+        compress_sidecar_file(tmp_path, sidecar_tmp, codec)
+        print(f"Wrote {sidecar_path.name}: {os.path.getsize(sidecar_tmp) / 1024:.1f} KiB "
+              f"({os.path.getsize(tmp_path) / 1024:.1f} KiB uncompressed)")
+        _replace(sidecar_tmp, sidecar_path, manifest)
+    _replace(tmp_path, path, manifest)
+
+
+def _replace(tmp_path: str, path: Path, manifest: Optional[ExportManifest]) -> None:
+    if manifest is not None:
+        manifest.replace_if_changed(tmp_path, str(path))
+    else:
+        os.replace(tmp_path, path)
 
 
-def write_floor_images_ts(data: Dict[str, Any], path: Path) -> None:
+def write_json(data: Dict[str, Any], path: Path, manifest: Optional[ExportManifest] = None) -> None:
+    write_bytes(json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8"), path, manifest)
+
+
+def write_floor_images_ts(data: Dict[str, Any], path: Path, manifest: Optional[ExportManifest] = None) -> None:
     lines = [
         "export const floorImages = {",
     ]
@@ -108,8 +442,7 @@ def write_floor_images_ts(data: Dict[str, Any], path: Path) -> None:
         lines.append("  },")
     lines.append("} as const;\n")
 
-    ensure_dirs(path.parent)
-    path.write_text("\n".join(lines), encoding="utf-8")
+    write_bytes("\n".join(lines).encode("utf-8"), path, manifest)
 
 
 def main() -> None:
@@ -119,13 +452,133 @@ def main() -> None:
     parser.add_argument("--service-account", type=str, default=os.environ.get("FIREBASE_SERVICE_ACCOUNT"), help="Path to Firebase service account JSON (for admin SDK)")
     parser.add_argument("--db-url", type=str, default=os.environ.get("FIREBASE_DB_URL"), help="Firebase DB root URL (e.g. https://<project>-default-rtdb.firebaseio.com)")
     parser.add_argument("--auth", type=str, default=os.environ.get("FIREBASE_AUTH"), help="Optional Firebase auth token / database secret")
+    parser.add_argument("--full-push", action="store_true", help="Overwrite the whole tree instead of pushing only what changed since the last push")
+    parser.add_argument("--push-snapshot", type=str, default=str(PUSH_SNAPSHOT), help="Where the last pushed tree is kept for delta pushes")
+    parser.add_argument("--push-retries", type=int, default=RETRY_ATTEMPTS, help="Attempts per push before giving up")
+    parser.add_argument("--workers", type=int, default=1, help="Number of processes used to extract floors in parallel (default 1: no parallel extraction)")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore the on-disk extraction cache and re-parse every PDF")
+    parser.add_argument("--cache-dir", type=str, default=None, help="Directory for the extraction cache (defaults to .cache/extraction next to this script)")
+    parser.add_argument("--tiles", action="store_true", help="Also render each floor into a deep-zoom tile pyramid (<floor>_tiles/ next to the PNG)")
+    parser.add_argument("--tile-size", type=int, default=DEFAULT_TILE_SIZE, help="Tile edge length in pixels")
+    parser.add_argument("--tile-max-dimension", type=int, default=DEFAULT_MAX_DIMENSION, help="Longest side in pixels of the most detailed pyramid level")
+    parser.add_argument("--variants", action="store_true", help="Also write each floor image in several densities and formats (variants/ next to the PNGs)")
+    parser.add_argument("--densities", type=str, default=",".join(str(d) for d in DEFAULT_DENSITIES), help="Comma-separated pixel densities for --variants, e.g. 1,2,3")
+    parser.add_argument("--formats", type=str, default=",".join(DEFAULT_FORMATS), help=f"Comma-separated formats for --variants ({', '.join(FORMAT_EXTENSIONS)})")
+    parser.add_argument("--variant-base-dimension", type=int, default=DEFAULT_BASE_DIMENSION, help="Longest side in pixels of the 1x variant")
+    parser.add_argument("--png-compress-level", type=int, default=DEFAULT_ENCODE_SETTINGS["png_compress_level"], help="zlib level (0-9) for PNG variants")
+    parser.add_argument("--palette-colors", type=int, default=DEFAULT_ENCODE_SETTINGS["palette_colors"], help="Palette size for quantized PNG variants")
+    parser.add_argument("--webp-quality", type=int, default=DEFAULT_ENCODE_SETTINGS["webp_quality"], help="Quality (0-100) for WebP variants")
+    parser.add_argument("--webp-lossless", action="store_true", help="Encode WebP variants losslessly")
+    parser.add_argument("--variants-report", type=str, default=str(VARIANTS_REPORT), help="Where to write the variant sizes and encode times (JSON)")
+    parser.add_argument("--vector", action="store_true", help="Also write each floor's drawings as an SVG next to the PNG, where that is smaller than the PNG")
+    parser.add_argument("--vector-grid", type=int, default=DEFAULT_GRID, help="Integer grid (SVG units) on the longer page side that vector coordinates snap to")
+    parser.add_argument("--vector-tolerance", type=float, default=DEFAULT_TOLERANCE, help="Path simplification tolerance in grid units")
+    parser.add_argument("--vector-labels", action="store_true", help="Add the room and entrance labels to the SVG (the app draws its own, so they are left out by default)")
+    parser.add_argument("--compress", action="store_true", help="Quantize floor PNGs to a small palette (or grey levels) chosen per floor, within a byte budget")
+    parser.add_argument("--byte-budget", type=int, default=DEFAULT_BYTE_BUDGET // 1024, help="Per-floor PNG budget in KiB for --compress (0 disables the budget)")
+    parser.add_argument("--compress-max-colors", type=int, default=DEFAULT_MAX_COLORS, help="Largest palette --compress may choose")
+    parser.add_argument("--dither", action="store_true", help="Dither when quantizing with --compress")
+    parser.add_argument("--min-scale", type=float, default=DEFAULT_MIN_SCALE, help="Smallest fraction of the render size --compress may scale down to")
+    parser.add_argument("--compression-report", type=str, default=str(COMPRESSION_REPORT), help="Where to write the --compress results (JSON)")
+    parser.add_argument("--compact", action="store_true", help="Write and push buildings.json in the compact columnar format (see compact_payload)")
+    parser.add_argument("--coord-scale", type=int, default=DEFAULT_COORD_SCALE, help="Coordinate resolution of --compact (positions are stored as integers 0..scale)")
+    parser.add_argument("--sidecar", action="append", choices=sorted(SIDECARS), default=[], help="Also write buildings.json.gz/.br next to buildings.json (repeatable)")
+    parser.add_argument("--shards", action="store_true", help="Also write a hashed index plus one JSON shard per building (or floor), and push the index")
+    parser.add_argument("--shard-by", choices=SHARD_MODES, default="building", help="Shard granularity for --shards")
+    parser.add_argument("--shards-dir", type=str, default=str(SHARDS_DIR), help="Where --shards writes index.json and the shards")
+    parser.add_argument("--manifest", type=str, default=str(EXPORT_MANIFEST), help="Export manifest used to skip floors whose PDF is unchanged")
+    parser.add_argument("--full", action="store_true", help="Re-export every floor, ignoring the export manifest")
     args = parser.parse_args()
 
-    data = export_buildings()
-    write_json(data, DATA_DIR / "buildings.json")
-    write_floor_images_ts(data, DATA_DIR / "floorImages.ts")
+    formats = [fmt.strip() for fmt in args.formats.split(",") if fmt.strip()]
+    unknown = [fmt for fmt in formats if fmt not in FORMAT_EXTENSIONS]
+    if unknown:
+        raise RuntimeError(f"Unknown image format(s): {', '.join(unknown)}")
+
+    cache = None
+    if not args.no_cache:
+        cache = ExtractionCache(args.cache_dir) if args.cache_dir else ExtractionCache()
+
+    # Everything that changes a floor's exported files; a change invalidates the manifest
+    manifest_options = {
+        "classifier": CLASSIFIER_VERSION,
+        "imageScale": FLOOR_IMAGE_SCALE,
+        "tiles": [args.tile_size, args.tile_max_dimension] if args.tiles else None,
+        "variants": [args.densities, formats, args.variant_base_dimension, args.png_compress_level,
+                     args.palette_colors, args.webp_quality, args.webp_lossless] if args.variants else None,
+        "vector": [args.vector_grid, args.vector_tolerance, args.vector_labels] if args.vector else None,
+        "compress": [args.byte_budget, args.compress_max_colors, args.dither, args.min_scale] if args.compress else None,
+    }
+    manifest = ExportManifest(args.manifest, manifest_options, reuse=not args.full)
+
+    exported_buildings = iter_export_buildings(
+        max_workers=args.workers,
+        cache=cache,
+        tiles=args.tiles,
+        tile_size=args.tile_size,
+        tile_max_dimension=args.tile_max_dimension,
+        variants=args.variants,
+        variant_densities=[int(d) for d in args.densities.split(",") if d.strip()],
+        variant_formats=formats,
+        variant_base_dimension=args.variant_base_dimension,
+        encode_settings={
+            "png_compress_level": args.png_compress_level,
+            "palette_colors": args.palette_colors,
+            "webp_quality": args.webp_quality,
+            "webp_lossless": args.webp_lossless,
+        },
+        variants_report=Path(args.variants_report),
+        vector=args.vector,
+        vector_grid=args.vector_grid,
+        vector_tolerance=args.vector_tolerance,
+        vector_labels=args.vector_labels,
+        compress=args.compress,
+        byte_budget=args.byte_budget * 1024 if args.byte_budget > 0 else None,
+        compress_max_colors=args.compress_max_colors,
+        dither=args.dither,
+        min_scale=args.min_scale,
+        compression_report=Path(args.compression_report),
+        manifest=manifest,
+    )
+    # Each building is written as soon as it is exported and then dropped
+    header = compact_header(args.coord_scale) if args.compact else {}
+    buildings_path = DATA_DIR / "buildings.json"
+    writer = BuildingsJsonWriter(str(buildings_path), header)
+    shard_writer = None
+    if args.shards:
+        shard_writer = ShardWriter(args.shards_dir, lambda shard, path: write_bytes(shard, Path(path), manifest),
+                                   header, args.shard_by)
+    floor_images: Dict[str, Any] = {"buildings": {}}
+    try:
+        for building_slug, building in exported_buildings:
+            floor_images["buildings"][building_slug] = {
+                "floors": {floor_slug: {"image": floor["image"]} for floor_slug, floor in building["floors"].items()},
+            }
+            if args.compact:
+                building = compact_building(building, args.coord_scale)
+            writer.add(building_slug, building)
+            if shard_writer is not None:
+                shard_writer.add(building_slug, building)
+    except BaseException:
+        writer.abort()
+        raise
+    commit_file(writer.close(), buildings_path, manifest, args.sidecar)
+    write_floor_images_ts(floor_images, DATA_DIR / "floorImages.ts", manifest)
+    index = None
+    if shard_writer is not None:
+        index = shard_writer.close()
+        print(f"Wrote shard index for {len(index['buildings'])} buildings to {args.shards_dir}")
+    manifest.save()
+    reused, exported, written, skipped = manifest.summary()
+    print(f"Floors: {exported} exported, {reused} unchanged; files: {written} written, {skipped} identical")
 
     if args.push_to_firebase:
+        # The push diffs the whole tree, which is the JSON alone: no documents or bitmaps
+        with buildings_path.open("r", encoding="utf-8") as f:
+            data = json.load(f)
+        if index is not None:
+            # Pushed next to the buildings, so clients can read /buildings/index and fetch one building
+            data["index"] = index
         db_url = args.db_url
         if not db_url:
             raise RuntimeError("Firebase DB URL not provided. Set --db-url or FIREBASE_DB_URL env var")
@@ -143,18 +596,20 @@ def main() -> None:
                 # Initialize app with explicit databaseURL
                 firebase_admin.initialize_app(cred, {"databaseURL": db_url})
                 ref = firebase_db.reference("/buildings")
-                ref.set(data)
+                push_delta(f"{db_url.rstrip('/')}/buildings", data, args.push_snapshot,
+                           lambda full, updates: push_admin(ref, full, updates, args.push_retries),
+                           full=args.full_push)
                 print("Push to Firebase (admin) successful.")
             except Exception as exc:
                 print(f"Failed to push to Firebase using admin SDK: {exc}")
         else:
             # push under root 'buildings' key via REST
             target = db_url.rstrip("/") + "/buildings.json"
-            params = {"auth": args.auth} if args.auth else None
             print(f"Pushing data to Firebase via REST: {target}")
             try:
-                resp = requests.put(target, params=params, json=data, timeout=30)
-                resp.raise_for_status()
+                push_delta(target, data, args.push_snapshot,
+                           lambda full, updates: push_rest(target, args.auth, full, updates, args.push_retries),
+                           full=args.full_push)
                 print("Push to Firebase successful.")
             except Exception as exc:
                 print(f"Failed to push to Firebase: {exc}")
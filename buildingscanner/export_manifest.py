@@ -0,0 +1,188 @@
+"""
+Manifest for incremental exports
+Remembers each floor's source PDF and payload so unchanged floors are not re-rendered
+"""
+
+import hashlib
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+# 2: floors also carry their report rows
+# 3: floors list the files they were exported to
+MANIFEST_VERSION = 3
+
+
+def file_sha256(path: str) -> str:
+    """SHA-256 of a file's bytes"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ExportManifest:
+    """Source and output fingerprints of the last export.
+
+    Floors are keyed by PDF path and page. A floor is unchanged when its PDF
+    has the same size and mtime as last time, or failing that the same
+    SHA-256, and the export options are the same; its recorded payload is
+    then reused. Outputs are recorded with their hash, size and mtime so
+    write_if_changed() can skip byte-identical writes without reading the
+    existing file. Each floor also lists the outputs it was exported to.
+    Only floors and outputs seen in this run (written, or belonging to a
+    reused floor) are kept on save(), so removed floors and buildings drop
+    out. With reuse=False every floor counts as changed but is still
+    recorded.
+    """
+
+    def __init__(self, path: str, options: Dict[str, Any], reuse: bool = True):
+        self.path = path
+        self.reuse = reuse
+        # Anything that changes what a floor exports to; a change re-exports everything
+        self.options = json.loads(json.dumps(options, sort_keys=True, default=str))
+        self._floors: Dict[str, Dict[str, Any]] = {}
+        self._outputs: Dict[str, Dict[str, Any]] = {}
+        self._new_floors: Dict[str, Dict[str, Any]] = {}
+        self._seen_outputs: set = set()
+        self.reused = 0
+        self.exported = 0
+        self.written = 0
+        self.skipped_writes = 0
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest["version"] != MANIFEST_VERSION:
+                return
+            self._outputs = manifest["outputs"]
+            if manifest["options"] == self.options:
+                self._floors = manifest["floors"]
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    @staticmethod
+    def floor_key(pdf_path: str, page_number: int = 0) -> str:
+        return f"{os.path.abspath(pdf_path)}#{page_number}"
+
+    def _source_signature(self, pdf_path: str, previous: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        stat = os.stat(pdf_path)
+        signature = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        if previous is not None and previous["size"] == stat.st_size and previous["mtime_ns"] == stat.st_mtime_ns:
+            signature["sha256"] = previous["sha256"]
+        else:
+            signature["sha256"] = file_sha256(pdf_path)
+        return signature
+
+    def unchanged_floor(self, pdf_path: str, page_number: int = 0) -> Optional[Dict[str, Any]]:
+        """Payload from the last export if the floor's PDF is unchanged, else None
+
+        If any file the floor was exported to is missing, it is exported again.
+        """
+        key = self.floor_key(pdf_path, page_number)
+        previous = self._floors.get(key)
+        if previous is None or not self.reuse:
+            return None
+        try:
+            signature = self._source_signature(pdf_path, previous and previous["source"])
+        except OSError:
+            return None
+        if previous["source"]["sha256"] != signature["sha256"]:
+            return None
+        if not all(os.path.exists(path) for path in previous["outputs"]):
+            return None
+
+        self._new_floors[key] = {"source": signature, "payload": previous["payload"],
+                                 "reports": previous["reports"], "outputs": previous["outputs"]}
+        self._seen_outputs.update(previous["outputs"])
+        self.reused += 1
+        return previous["payload"]
+
+    def floor_reports(self, pdf_path: str, page_number: int = 0) -> Dict[str, List[Dict[str, Any]]]:
+        """Report rows recorded with a floor, e.g. to replay them when it is reused"""
+        entry = self._new_floors.get(self.floor_key(pdf_path, page_number))
+        return entry["reports"] if entry is not None else {}
+
+    def record_floor(self, pdf_path: str, page_number: int, payload: Dict[str, Any],
+                     reports: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+                     outputs: Optional[List[str]] = None):
+        """Remember a freshly exported floor, with its report rows ({report name: rows})
+        and the files it was written to
+        """
+        key = self.floor_key(pdf_path, page_number)
+        previous = self._floors.get(key)
+        self._new_floors[key] = {
+            "source": self._source_signature(pdf_path, previous and previous["source"]),
+            "payload": payload,
+            "reports": reports or {},
+            "outputs": [os.path.abspath(path) for path in outputs or []],
+        }
+        self.exported += 1
+
+    def _output_unchanged(self, path: str, size: int, digest: str) -> bool:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        if stat.st_size != size:
+            return False
+        recorded = self._outputs.get(os.path.abspath(path))
+        if recorded is not None and recorded["mtime_ns"] == stat.st_mtime_ns and recorded["size"] == stat.st_size:
+            return recorded["sha256"] == digest
+        return file_sha256(path) == digest
+
+    def _record_output(self, path: str, digest: str, changed: bool):
+        if changed:
+            self.written += 1
+        else:
+            self.skipped_writes += 1
+        stat = os.stat(path)
+        self._outputs[os.path.abspath(path)] = {"sha256": digest, "size": stat.st_size,
+                                                "mtime_ns": stat.st_mtime_ns}
+        self._seen_outputs.add(os.path.abspath(path))
+
+    def write_if_changed(self, path: str, data: bytes) -> bool:
+        """Write data to path unless the file already holds exactly these bytes"""
+        digest = hashlib.sha256(data).hexdigest()
+        changed = not self._output_unchanged(path, len(data), digest)
+        if changed:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(data)
+        self._record_output(path, digest, changed)
+        return changed
+
+    def replace_if_changed(self, tmp_path: str, path: str) -> bool:
+        """Move a finished file onto path, or discard it if path already holds the same bytes"""
+        digest = file_sha256(tmp_path)
+        changed = not self._output_unchanged(path, os.path.getsize(tmp_path), digest)
+        if changed:
+            os.replace(tmp_path, path)
+        else:
+            os.remove(tmp_path)
+        self._record_output(path, digest, changed)
+        return changed
+
+    def save(self):
+        """Write the manifest for the next run"""
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "options": self.options,
+            "floors": self._new_floors,
+            "outputs": {path: output for path, output in self._outputs.items() if path in self._seen_outputs},
+        }
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Warning: could not write export manifest {self.path}: {e}")
+
+    def summary(self) -> Tuple[int, int, int, int]:
+        """(floors reused, floors exported, files written, identical writes skipped)"""
+        return self.reused, self.exported, self.written, self.skipped_writes
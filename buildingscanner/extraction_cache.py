@@ -0,0 +1,111 @@
+"""
+On-disk cache for PDF extraction results
+Keyed by the PDF's content hash so unchanged floors skip the PyMuPDF text pass
+"""
+
+import hashlib
+import json
+import os
+from typing import Optional, Tuple
+
+from floor_labels import LabelTable
+from pdf_parser import CLASSIFIER_VERSION
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "extraction")
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024  # 64 MB
+
+
+class ExtractionCache:
+    """Persistent cache of (rooms, entrances) per PDF content hash.
+
+    Entries are small JSON files named after the SHA-256 of the PDF bytes
+    and the classifier version, so editing a PDF or changing the room rules
+    both miss naturally. When the directory grows past max_bytes the least
+    recently used entries (by mtime, refreshed on every hit) are removed.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES,
+                 version: int = CLASSIFIER_VERSION):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.version = version
+        # (path, size, mtime) -> hex digest, so multi-page PDFs are hashed once
+        self._digests = {}
+
+    def content_hash(self, pdf_path: str) -> str:
+        """SHA-256 of a PDF's bytes"""
+        stat = os.stat(pdf_path)
+        memo_key = (pdf_path, stat.st_size, stat.st_mtime_ns)
+        if memo_key not in self._digests:
+            digest = hashlib.sha256()
+            with open(pdf_path, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(chunk)
+            self._digests[memo_key] = digest.hexdigest()
+        return self._digests[memo_key]
+
+    def key_for(self, pdf_path: str, page_number: int = 0) -> str:
+        """Content hash of a PDF combined with the page and classifier version"""
+        return f"{self.content_hash(pdf_path)}-p{page_number}-v{self.version}"
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Tuple[LabelTable, LabelTable]]:
+        """Return cached (rooms, entrances) or None on a miss"""
+        path = self._entry_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path)  # mark as recently used
+            return (LabelTable.from_columns(entry["rooms"]),
+                    LabelTable.from_columns(entry["entrances"]))
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def put(self, key: str, rooms: LabelTable, entrances: LabelTable):
+        """Store extraction results and evict old entries if over budget"""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self._entry_path(key)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"rooms": rooms.to_columns(), "entrances": entrances.to_columns()},
+                          f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+            self.evict()
+        except OSError as e:
+            print(f"Warning: could not write extraction cache entry {key}: {e}")
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes"""
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def clear(self):
+        """Remove every cache entry"""
+        if not os.path.isdir(self.cache_dir):
+            return
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".json"):
+                os.remove(os.path.join(self.cache_dir, name))
@@ -0,0 +1,159 @@
+"""
+Delta pushes to the Firebase Realtime Database
+Keeps the last pushed tree and sends only changed subtrees as one multi-path update
+"""
+
+import json
+import os
+import time
+from typing import Any, Callable, Dict, Optional
+
+SNAPSHOT_VERSION = 1
+
+# buildings/<building>/floors/<floor>: a changed floor is re-sent whole, never single rooms
+DIFF_DEPTH = 4
+
+RETRY_ATTEMPTS = 5
+RETRY_BACKOFF = 0.5  # seconds, doubled after every failed attempt
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+def diff_tree(old: Any, new: Any, max_depth: int = DIFF_DEPTH, path: str = "") -> Dict[str, Any]:
+    """Multi-path update turning old into new
+
+    Keys are slash-separated paths below the pushed node; removed subtrees
+    map to None, which deletes them. Dicts are compared key by key down to
+    max_depth levels; below that, and for anything that isn't a dict, a
+    changed value is replaced as a whole.
+    """
+    if old == new:
+        return {}
+    if max_depth == 0 or not isinstance(old, dict) or not isinstance(new, dict):
+        return {path: new}
+
+    updates: Dict[str, Any] = {}
+    for key in old.keys() - new.keys():
+        updates[f"{path}/{key}" if path else key] = None
+    for key, value in new.items():
+        child = f"{path}/{key}" if path else key
+        if key not in old:
+            updates[child] = value
+        else:
+            updates.update(diff_tree(old[key], value, max_depth - 1, child))
+    return updates
+
+
+def load_snapshot(path: str, target: str) -> Optional[Any]:
+    """Tree last pushed to target, or None if unknown"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+        if snapshot["version"] != SNAPSHOT_VERSION or snapshot["target"] != target:
+            return None
+        return snapshot["data"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def save_snapshot(path: str, target: str, data: Any):
+    """Remember the tree that target now holds"""
+    snapshot = {"version": SNAPSHOT_VERSION, "target": target, "data": data}
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Warning: could not write push snapshot {path}: {e}")
+
+
+def with_retry(func: Callable[[], Any], retryable: Callable[[Exception], bool],
+               attempts: int = RETRY_ATTEMPTS, backoff: float = RETRY_BACKOFF) -> Any:
+    """Call func, retrying retryable failures with exponential backoff"""
+    for attempt in range(attempts):
+        try:
+            return func()
+        except Exception as exc:
+            if attempt == attempts - 1 or not retryable(exc):
+                raise
+            delay = backoff * 2 ** attempt
+            print(f"  Push failed ({exc}); retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def _retryable_http(exc: Exception) -> bool:
+    import requests
+
+    if isinstance(exc, (requests.ConnectionError, requests.Timeout)):
+        return True
+    response = getattr(exc, "response", None)
+    return response is not None and response.status_code in RETRY_STATUS
+
+
+def _retryable_admin(exc: Exception) -> bool:
+    from firebase_admin import exceptions
+
+    # firebase-admin maps connection errors, timeouts and 429/5xx responses to these
+    return isinstance(exc, (exceptions.UnavailableError, exceptions.DeadlineExceededError,
+                            exceptions.InternalError, exceptions.ResourceExhaustedError))
+
+
+def push_rest(url: str, auth: Optional[str], data: Any, updates: Optional[Dict[str, Any]],
+              attempts: int = RETRY_ATTEMPTS, backoff: float = RETRY_BACKOFF):
+    """PUT data to url, or PATCH only updates when given"""
+    import requests
+
+    params = {"auth": auth} if auth else None
+
+    def send():
+        if updates is None:
+            response = requests.put(url, params=params, json=data, timeout=30)
+        else:
+            response = requests.patch(url, params=params, json=updates, timeout=30)
+        response.raise_for_status()
+
+    with_retry(send, _retryable_http, attempts, backoff)
+
+
+def push_admin(ref, data: Any, updates: Optional[Dict[str, Any]],
+               attempts: int = RETRY_ATTEMPTS, backoff: float = RETRY_BACKOFF):
+    """ref.set(data), or ref.update(updates) when given (firebase-admin reference)"""
+    def send():
+        if updates is None:
+            ref.set(data)
+        else:
+            ref.update(updates)
+
+    with_retry(send, _retryable_admin, attempts, backoff)
+
+
+def push_delta(target: str, data: Any, snapshot_path: str, send: Callable[[Any, Optional[Dict[str, Any]]], None],
+               full: bool = False) -> int:
+    """Push data to target, sending only what changed since the last push
+
+    send(data, updates) performs the write: updates is None for a full
+    write, which happens with full=True or when there is no snapshot for
+    target. The snapshot is only replaced after a successful push. Returns
+    the number of paths written (0 when nothing changed).
+    """
+    # Compare what Firebase will hold, not Python-specific types (tuples, int keys)
+    data = json.loads(json.dumps(data))
+    previous = None if full else load_snapshot(snapshot_path, target)
+
+    if previous is None:
+        print(f"Full push to {target}")
+        send(data, None)
+        count = 1
+    else:
+        updates = diff_tree(previous, data)
+        if not updates:
+            print(f"Nothing changed since the last push to {target}")
+            return 0
+        print(f"Pushing {len(updates)} changed path(s) to {target}: {', '.join(sorted(updates)[:5])}"
+              + (" ..." if len(updates) > 5 else ""))
+        send(data, updates)
+        count = len(updates)
+
+    save_snapshot(snapshot_path, target, data)
+    return count
@@ -0,0 +1,149 @@
+"""
+Compact storage for the room and entrance labels of a floor
+Parallel typed arrays instead of one dict per label
+"""
+
+import sys
+from array import array
+from typing import Any, Dict, Iterator, List, Optional
+
+
+class Label:
+    """Lightweight view of one row in a LabelTable
+
+    Supports both attribute access (label.x) and the old dict-style
+    access (label['x']) so existing callers keep working.
+    """
+
+    __slots__ = ('_table', '_index')
+
+    def __init__(self, table: 'LabelTable', index: int):
+        self._table = table
+        self._index = index
+
+    @property
+    def id(self) -> Optional[str]:
+        ids = self._table.ids
+        return ids[self._index] if ids is not None else None
+
+    @property
+    def text(self) -> str:
+        return self._table.texts[self._index]
+
+    @property
+    def x(self) -> float:
+        return self._table.xs[self._index]
+
+    @property
+    def y(self) -> float:
+        return self._table.ys[self._index]
+
+    @property
+    def font_size(self) -> float:
+        return self._table.font_sizes[self._index]
+
+    @property
+    def normalized_font_size(self) -> float:
+        return self._table.font_sizes[self._index] / self._table.size_scale_factor
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._table.fields:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key not in self._table.fields:
+            return default
+        return getattr(self, key)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain dict in the exported JSON field order"""
+        return {field: getattr(self, field) for field in self._table.fields}
+
+    def __repr__(self) -> str:
+        return f"Label({self.to_dict()!r})"
+
+
+class LabelTable:
+    """Labels of one kind (rooms or entrances) on one floor
+
+    Coordinates are stored as doubles, font sizes as 32-bit floats (PyMuPDF
+    reports them in single precision, so nothing is lost), and the
+    normalized font size is derived from the floor's size scale factor
+    instead of being stored. Room IDs are interned and the original text
+    shares the ID string whenever it is already uppercase.
+    """
+
+    __slots__ = ('ids', 'texts', 'xs', 'ys', 'font_sizes', 'size_scale_factor', 'fields')
+
+    ROOM_FIELDS = ('id', 'text', 'x', 'y', 'font_size', 'normalized_font_size')
+    ENTRANCE_FIELDS = ('text', 'x', 'y', 'font_size', 'normalized_font_size')
+
+    def __init__(self, with_ids: bool = True, size_scale_factor: float = 1.0):
+        self.ids: Optional[List[str]] = [] if with_ids else None
+        self.texts: List[str] = []
+        self.xs = array('d')
+        self.ys = array('d')
+        self.font_sizes = array('f')
+        self.size_scale_factor = size_scale_factor
+        self.fields = self.ROOM_FIELDS if with_ids else self.ENTRANCE_FIELDS
+
+    def append(self, text: str, x: float, y: float, font_size: float):
+        """Add a label; rooms get the uppercased text as their ID"""
+        if self.ids is not None:
+            label_id = sys.intern(text.upper())
+            self.ids.append(label_id)
+            if text == label_id:
+                text = label_id
+        self.texts.append(text)
+        self.xs.append(x)
+        self.ys.append(y)
+        self.font_sizes.append(font_size)
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def __getitem__(self, index: int) -> Label:
+        if index < 0:
+            index += len(self.texts)
+        if not 0 <= index < len(self.texts):
+            raise IndexError("label index out of range")
+        return Label(self, index)
+
+    def __iter__(self) -> Iterator[Label]:
+        for index in range(len(self.texts)):
+            yield Label(self, index)
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Rows as plain dicts, for JSON export"""
+        return [label.to_dict() for label in self]
+
+    def to_columns(self) -> Dict[str, Any]:
+        """JSON-serializable column form, see from_columns()"""
+        return {
+            'ids': self.ids,
+            'texts': self.texts,
+            'x': self.xs.tolist(),
+            'y': self.ys.tolist(),
+            'font_size': self.font_sizes.tolist(),
+            'size_scale_factor': self.size_scale_factor,
+        }
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, Any]) -> 'LabelTable':
+        """Rebuild a table from to_columns() output"""
+        table = cls(with_ids=columns['ids'] is not None,
+                    size_scale_factor=columns['size_scale_factor'])
+        for text, x, y, font_size in zip(columns['texts'], columns['x'],
+                                         columns['y'], columns['font_size']):
+            table.append(text, x, y, font_size)
+        return table
+
+    def __getstate__(self):
+        return self.to_columns()
+
+    def __setstate__(self, state):
+        # Going through from_columns re-interns IDs in the receiving process
+        table = self.from_columns(state)
+        for name in self.__slots__:
+            setattr(self, name, getattr(table, name))
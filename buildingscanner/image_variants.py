@@ -0,0 +1,145 @@
+"""Floor images in several pixel densities and encodings.
+
+Each floor is rendered once at the largest density, downscaled for the
+smaller ones and encoded in every requested format:
+
+    <out_dir>/<name>@<density>x.png       lossless PNG
+    <out_dir>/<name>@<density>x.pal.png   palette-quantized PNG
+    <out_dir>/<name>@<density>x.webp      WebP
+
+Density 1x means the longer side is base_dimension pixels. Resizing and
+encoding run in a thread pool when an executor is given: Pillow releases
+the GIL while it resizes and compresses, and no PyMuPDF call is involved,
+so threads avoid pickling full-size bitmaps into worker processes. Files
+are written from the calling thread, through write(data, path) if given.
+"""
+
+from __future__ import annotations
+
+import io
+import os
+import time
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_DENSITIES = (1, 2, 3)
+DEFAULT_FORMATS = ("png", "png8", "webp")
+DEFAULT_BASE_DIMENSION = 1024
+
+FORMAT_EXTENSIONS = {
+    "png": ".png",
+    "png8": ".pal.png",
+    "webp": ".webp",
+}
+
+DEFAULT_ENCODE_SETTINGS: Dict[str, Any] = {
+    "png_compress_level": 9,
+    "palette_colors": 256,
+    "webp_quality": 80,
+    "webp_method": 6,
+    "webp_lossless": False,
+}
+
+
+def variant_filename(name: str, density: int, fmt: str) -> str:
+    """File name of one variant, e.g. stue@2x.webp"""
+    return f"{name}@{density}x{FORMAT_EXTENSIONS[fmt]}"
+
+
+def resize_for_density(image, density: int, top_density: int):
+    """Downscale the top-density render to another density"""
+    from PIL import Image
+
+    if density == top_density:
+        return image
+    fit = density / top_density
+    size = (max(1, round(image.size[0] * fit)), max(1, round(image.size[1] * fit)))
+    return image.resize(size, Image.Resampling.LANCZOS)
+
+
+def encode_variant(image, path: str, fmt: str, settings: Dict[str, Any]) -> Tuple[bytes, Dict[str, Any]]:
+    """Encode one image for path; returns the encoded bytes and its report row"""
+    from PIL import Image
+
+    start = time.perf_counter()
+    buffer = io.BytesIO()
+    if fmt == "png":
+        image.save(buffer, "PNG", compress_level=settings["png_compress_level"])
+    elif fmt == "png8":
+        # No dithering: plans are flat colours and thin lines, which dithering only blurs
+        palette_image = image.convert("RGB").quantize(colors=settings["palette_colors"],
+                                                      method=Image.Quantize.FASTOCTREE,
+                                                      dither=Image.Dither.NONE)
+        palette_image.save(buffer, "PNG", compress_level=settings["png_compress_level"])
+    elif fmt == "webp":
+        image.save(buffer, "WEBP", quality=settings["webp_quality"], method=settings["webp_method"],
+                   lossless=settings["webp_lossless"])
+    else:
+        raise ValueError(f"Unknown image format: {fmt}")
+
+    data = buffer.getvalue()
+    return data, {
+        "file": os.path.basename(path),
+        "format": fmt,
+        "width": image.size[0],
+        "height": image.size[1],
+        "bytes": len(data),
+        "encodeSeconds": round(time.perf_counter() - start, 4),
+    }
+
+
+def _write_file(data: bytes, path: str) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def export_image_variants(image, out_dir: str, name: str,
+                          densities: Sequence[int] = DEFAULT_DENSITIES,
+                          formats: Sequence[str] = DEFAULT_FORMATS,
+                          settings: Optional[Dict[str, Any]] = None,
+                          executor: Optional[Executor] = None,
+                          write: Optional[Callable[[bytes, str], Any]] = None
+                          ) -> Tuple[Dict[str, Dict[str, str]], List[Dict[str, Any]]]:
+    """Write every density/format variant of a top-density render
+
+    Returns ({format: {"<d>x": file name}}, report rows).
+    """
+    settings = {**DEFAULT_ENCODE_SETTINGS, **(settings or {})}
+    write = write or _write_file
+    top_density = max(densities)
+
+    def submit(func, *args):
+        if executor is None:
+            return _Done(func(*args))
+        return executor.submit(func, *args)
+
+    resized = {density: submit(resize_for_density, image, density, top_density)
+               for density in densities}
+
+    encodes = []
+    for density in densities:
+        density_image = resized[density].result()
+        for fmt in formats:
+            path = os.path.join(out_dir, variant_filename(name, density, fmt))
+            encodes.append((density, fmt, path, submit(encode_variant, density_image, path, fmt, settings)))
+
+    files: Dict[str, Dict[str, str]] = {}
+    report = []
+    for density, fmt, path, future in encodes:
+        data, row = future.result()
+        write(data, path)
+        row["density"] = density
+        report.append(row)
+        files.setdefault(fmt, {})[f"{density}x"] = row["file"]
+    return files, report
+
+
+class _Done:
+    """Already computed result with the Future.result() interface"""
+
+    def __init__(self, value):
+        self._value = value
+
+    def result(self):
+        return self._value
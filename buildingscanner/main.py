@@ -3,9 +3,13 @@ iPhone-style Building Navigation App
 Main GUI application with mobile-like interface
 """
 
+import time
+STARTUP_START = time.perf_counter()  # before any other import, for --startup-time
+
+import argparse
+import importlib.util
 import tkinter as tk
 from tkinter import ttk, messagebox
-from PIL import Image, ImageTk, ImageDraw
 import os
 import sys
 
@@ -13,20 +17,58 @@ import sys
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from pdf_parser import BuildingManager
+from extraction_cache import ExtractionCache
+from render_cache import RenderCache
+from background_jobs import JobRunner
+from building_index import IncrementalRoomSearch
+
+# Floors are rendered at this scale, fitted into the image area
+# (iPhone width minus padding, available height for image)
+FLOOR_RENDER_SCALE = 1.5
+FLOOR_DISPLAY_SIZE = (335, 400)
+
+# Generated list of buildings, so startup doesn't scan every building folder
+BUILDING_MANIFEST = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                 ".cache", "buildings.json")
+
+MARKER_SIZE = 8
+ROOM_MARKER_COLORS = ('#4CAF50', '#2E7D32')  # fill, outline
+ENTRANCE_MARKER_COLORS = ('#FF9800', '#F57C00')
+
+# Imported lazily by the loading jobs, so they are checked for up front
+REQUIRED_MODULES = {'fitz': 'PyMuPDF', 'PIL': 'Pillow', 'numpy': 'numpy'}
+
+# Search-as-you-type waits this long after the last keystroke
+SEARCH_DEBOUNCE_MS = 120
+MAX_SUGGESTIONS = 5
 
 class BuildingNavigationApp:
-    def __init__(self, root):
+    def __init__(self, root, workers: int = 1):
         self.root = root
         self.setup_window()
         self.setup_styles()
         
         # Initialize building manager
         buildings_path = os.path.join(os.path.dirname(__file__), "bygninger")
-        self.building_manager = BuildingManager(buildings_path)
+        self.building_manager = BuildingManager(buildings_path,
+                                                max_workers=workers,
+                                                cache=ExtractionCache(),
+                                                max_open_documents=4,
+                                                render_cache=RenderCache(),
+                                                prefetch_render=(FLOOR_RENDER_SCALE, FLOOR_DISPLAY_SIZE),
+                                                building_manifest=BUILDING_MANIFEST)
+        
+        # Loading, searching and rendering run here, off the Tk thread
+        self.jobs = JobRunner(self.root)
         
         # GUI variables
         self.current_floor_image = None
+        self.current_floor_key = None  # (building, floor) shown on the canvas
         self.current_result = None
+        self.room_search = None  # IncrementalRoomSearch over the loaded building
+        self.suggestions = []  # (floor, room) pairs shown in the suggestion list
+        self.suggest_after_id = None
+        self.discovery_seconds = 0.0  # time spent finding buildings, for --startup-time
         self.scale_factor = 1.0
         self.current_screen = "building_selection"  # "building_selection" or "room_search"
         
@@ -122,8 +164,21 @@ class BuildingNavigationApp:
         self.image_frame = tk.Frame(self.root, bg='white', relief=tk.FLAT, bd=1)
         self.image_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=(0, 40))
         
-        self.image_label = tk.Label(self.image_frame, bg='white')
-        self.image_label.pack(expand=True)
+        # The floor is one canvas image, replaced only when the floor changes;
+        # the markers are canvas items moved on top of it for every result
+        display_width, display_height = FLOOR_DISPLAY_SIZE
+        self.floor_canvas = tk.Canvas(self.image_frame, bg='white',
+                                      width=display_width, height=display_height,
+                                      highlightthickness=0)
+        self.floor_canvas.pack(expand=True)
+        self.floor_item = self.floor_canvas.create_image(display_width / 2, display_height / 2,
+                                                         anchor=tk.CENTER)
+        self.room_marker = self.floor_canvas.create_oval(0, 0, 0, 0, width=2, state=tk.HIDDEN,
+                                                         fill=ROOM_MARKER_COLORS[0],
+                                                         outline=ROOM_MARKER_COLORS[1])
+        self.entrance_marker = self.floor_canvas.create_oval(0, 0, 0, 0, width=2, state=tk.HIDDEN,
+                                                             fill=ENTRANCE_MARKER_COLORS[0],
+                                                             outline=ENTRANCE_MARKER_COLORS[1])
         
         # Loading label (initially hidden)
         self.loading_label = tk.Label(self.root,
@@ -174,13 +229,26 @@ class BuildingNavigationApp:
                                highlightbackground='#d1d1d6')
         search_entry.pack(fill=tk.X, pady=(0, 15), ipady=12)
         search_entry.bind('<Return>', lambda e: self.search_room())
+        self.search_var.trace_add('write', self.on_search_changed)
+        
+        # Top prefix matches across floors, shown while typing
+        self.suggestion_list = tk.Listbox(self.search_frame,
+                                          font=('SF Pro Display', 14),
+                                          bg='white',
+                                          fg='#1c1c1e',
+                                          relief=tk.FLAT,
+                                          bd=0,
+                                          highlightthickness=0,
+                                          selectbackground='#007AFF',
+                                          activestyle='none')
+        self.suggestion_list.bind('<<ListboxSelect>>', self.on_suggestion_selected)
         
         # Search button
-        search_btn = ttk.Button(self.search_frame,
-                               text="Søg",
-                               style='Search.TButton',
-                               command=self.search_room)
-        search_btn.pack(fill=tk.X, ipady=8)
+        self.search_btn = ttk.Button(self.search_frame,
+                                     text="Søg",
+                                     style='Search.TButton',
+                                     command=self.search_room)
+        self.search_btn.pack(fill=tk.X, ipady=8)
     
     def load_available_buildings(self):
         """Load list of available buildings"""
@@ -188,7 +256,9 @@ class BuildingNavigationApp:
         self.root.update()
         
         try:
+            discovery_start = time.perf_counter()
             buildings = self.building_manager.get_available_buildings()
+            self.discovery_seconds = time.perf_counter() - discovery_start
             if buildings:
                 self.show_building_selection()
                 self.populate_building_buttons(buildings)
@@ -213,28 +283,40 @@ class BuildingNavigationApp:
             btn.pack(fill=tk.X, pady=5, ipady=8)
     
     def select_building(self, building_name):
-        """Select and load a specific building"""
+        """Select and load a specific building in the background"""
         self.loading_label.config(text=f"Loading {building_name}...")
         self.loading_label.pack(pady=20)
-        self.root.update()
         
-        try:
-            success = self.building_manager.load_building_floors(building_name)
-            if success:
-                self.subtitle_label.config(text=building_name.title())
-                self.show_search_interface()
-                self.info_label.config(text="Ready to search! Enter a room number above.")
-            else:
-                self.info_label.config(text=f"Error loading {building_name}. Check PDF files.")
-        except Exception as e:
-            self.info_label.config(text=f"Error: {str(e)}")
-        finally:
-            self.loading_label.pack_forget()
+        # A search still running belongs to the previous building
+        self.jobs.cancel("search")
+        self.jobs.submit("building",
+                         lambda job: self.building_manager.load_building_floors(building_name,
+                                                                                progress=job.progress),
+                         on_done=lambda success: self.on_building_loaded(building_name, success),
+                         on_error=lambda e: self.on_building_error(e),
+                         on_progress=lambda floor, done, total: self.loading_label.config(
+                             text=f"Loading {building_name}... {done}/{total} ({floor})"))
+    
+    def on_building_loaded(self, building_name, success):
+        """Switch to the search screen once a building has loaded"""
+        self.loading_label.pack_forget()
+        self.clear_floor()
+        if success:
+            self.subtitle_label.config(text=building_name.title())
+            self.show_search_interface()
+            self.info_label.config(text="Ready to search! Enter a room number above.")
+        else:
+            self.info_label.config(text=f"Error loading {building_name}. Check PDF files.")
+    
+    def on_building_error(self, error):
+        self.loading_label.pack_forget()
+        self.info_label.config(text=f"Error: {str(error)}")
     
     def show_building_selection(self):
         """Show building selection screen"""
         self.current_screen = "building_selection"
         self.search_frame.pack_forget()
+        self.suggestion_list.pack_forget()
         self.building_frame.pack(fill=tk.BOTH, expand=True)
         self.subtitle_label.config(text="Vælg bygning")
         
@@ -244,132 +326,233 @@ class BuildingNavigationApp:
         self.building_frame.pack_forget()
         self.search_frame.pack(fill=tk.BOTH, expand=True)
     
+    def on_search_changed(self, *args):
+        """Debounce keystrokes before updating the suggestions"""
+        if self.suggest_after_id is not None:
+            self.root.after_cancel(self.suggest_after_id)
+        self.suggest_after_id = self.root.after(SEARCH_DEBOUNCE_MS, self.update_suggestions)
+    
+    def update_suggestions(self):
+        """Show the top rooms whose ID starts with the typed text
+        
+        Runs on the Tk thread: it only reads the room index of a building
+        that has finished loading, and narrowing the previous matches keeps
+        it well under a frame even for thousands of labels.
+        """
+        self.suggest_after_id = None
+        if self.current_screen != "room_search":
+            return
+        
+        room_index = self.building_manager.room_index
+        if self.room_search is None or self.room_search.index is not room_index:
+            self.room_search = IncrementalRoomSearch(room_index)
+        hits = self.room_search.update(self.search_var.get(), limit=MAX_SUGGESTIONS)
+        
+        all_rooms = self.building_manager.all_rooms
+        self.suggestions = [(floor_name, all_rooms[floor_name][index]) for floor_name, index in hits]
+        self.suggestion_list.delete(0, tk.END)
+        for floor_name, room in self.suggestions:
+            self.suggestion_list.insert(tk.END, f"{room['text']}  ·  {floor_name}")
+        
+        if self.suggestions:
+            self.suggestion_list.config(height=len(self.suggestions))
+            self.suggestion_list.pack(fill=tk.X, pady=(0, 15), before=self.search_btn)
+        else:
+            self.suggestion_list.pack_forget()
+    
+    def on_suggestion_selected(self, event=None):
+        """Search for the picked suggestion"""
+        selection = self.suggestion_list.curselection()
+        if not selection:
+            return
+        floor_name, room = self.suggestions[selection[0]]
+        self.search_var.set(room['id'])
+        self.search_room()
+    
     def search_room(self):
-        """Search for a room and display results"""
+        """Search for a room in the background and display the result"""
         query = self.search_var.get().strip()
         if not query:
             messagebox.showwarning("Input Error", "Please enter a room number")
             return
         
-        # Show loading
+        # Show loading; a newer search replaces this one
         self.info_label.config(text="Searching...")
-        self.root.update()
+        self.jobs.submit("search",
+                         lambda job: self.find_room(job, query),
+                         on_done=self.show_search_result,
+                         on_error=lambda e: self.info_label.config(text=f"Error searching: {str(e)}"))
+    
+    def find_room(self, job, query):
+        """Search, entrance lookup and rendering; runs on the job thread"""
+        # Search for room (all exact matches, in floor order)
+        results = self.building_manager.search_rooms(query)
+        if not results:
+            return {'query': query, 'results': results}
         
-        try:
-            # Search for room
-            result = self.building_manager.search_room(query)
-            
-            if not result:
-                self.info_label.config(text=f'Room "{query}" not found')
-                self.image_label.config(image='')
-                self.current_floor_image = None
-                return
-            
-            # Get room and floor info
-            room = result['room']
-            floor_name = result['floor']
-            parser = result['parser']
-            
-            # Find nearest entrance
-            nearest_entrance = self.building_manager.get_nearest_entrance(room['x'], room['y'])
-            
-            # Update info
-            entrance_text = ""
-            if nearest_entrance:
-                entrance_text = " • Orange prik viser nærmeste indgang"
-            
-            self.info_label.config(text=f'Found "{room["id"]}" on {floor_name}{entrance_text}')
-            
-            # Render PDF with markers
-            self.render_pdf_with_markers(parser, room, nearest_entrance)
-            
-            self.current_result = result
-            
-        except Exception as e:
-            self.info_label.config(text=f"Error searching: {str(e)}")
-            print(f"Search error: {e}")
+        # Show the first match; mention the other floors it appears on
+        result = results[0]
+        room = result['room']
+        
+        # Find nearest entrance
+        nearest_entrance = self.building_manager.get_nearest_entrance(room['x'], room['y'])
+        job.check_cancelled()
+        
+        # Usually a cache hit; it is only converted for Tk if the floor changed
+        floor_key = (self.building_manager.current_building, result['floor'])
+        image = self.render_floor_image(result['floor'])
+        return {'query': query, 'results': results, 'entrance': nearest_entrance,
+                'floor_key': floor_key, 'image': image}
     
-    def render_pdf_with_markers(self, parser, room, entrance=None):
-        """Render PDF page with room and entrance markers"""
-        try:
-            print(f"Rendering PDF with room at ({room['x']:.3f}, {room['y']:.3f})")
-            if entrance:
-                print(f"  and entrance at ({entrance['x']:.3f}, {entrance['y']:.3f})")
-                
-            # Render PDF as image with safe scaling
-            pdf_image = parser.render_pdf_as_image(scale=1.5)
-            if not pdf_image:
+    def show_search_result(self, found):
+        """Display a finished search; runs on the Tk thread"""
+        results = found['results']
+        if not results:
+            self.info_label.config(text=f'Room "{found["query"]}" not found')
+            self.clear_floor()
+            return
+        
+        result = results[0]
+        room = result['room']
+        floor_name = result['floor']
+        
+        # Update info
+        entrance_text = ""
+        if found['entrance']:
+            entrance_text = " • Orange prik viser nærmeste indgang"
+        
+        matches_text = ""
+        if len(results) > 1:
+            other_floors = ", ".join(r['floor'] for r in results[1:])
+            matches_text = f" ({len(results)} matches, also on {other_floors})"
+        
+        self.info_label.config(text=f'Found "{room["id"]}" on {floor_name}{matches_text}{entrance_text}')
+        
+        if found['floor_key'] != self.current_floor_key:
+            if found['image'] is None:
                 self.info_label.config(text="Error rendering PDF")
-                print("Failed to render PDF as image")
+                self.clear_floor()
                 return
-            
-            # Get image dimensions
-            img_width, img_height = pdf_image.size
-            
-            # Calculate scale to fit in display area (maintaining aspect ratio)
-            display_width = 335  # iPhone width minus padding
-            display_height = 400  # Available height for image
-            
-            scale_x = display_width / img_width
-            scale_y = display_height / img_height
-            self.scale_factor = min(scale_x, scale_y)
-            
-            # Resize image
-            new_width = int(img_width * self.scale_factor)
-            new_height = int(img_height * self.scale_factor)
-            pdf_image = pdf_image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-            
-            # Create drawing context
-            draw = ImageDraw.Draw(pdf_image)
-            
-            # Draw room marker (green circle)
-            room_x = room['x'] * new_width
-            room_y = room['y'] * new_height
-            marker_size = 8
-            
-            draw.ellipse([room_x - marker_size, room_y - marker_size,
-                         room_x + marker_size, room_y + marker_size],
-                        fill='#4CAF50', outline='#2E7D32', width=2)
-            
-            # Draw entrance marker (orange circle)
-            if entrance:
-                entrance_x = entrance['x'] * new_width
-                entrance_y = entrance['y'] * new_height
-                
-                draw.ellipse([entrance_x - marker_size, entrance_y - marker_size,
-                             entrance_x + marker_size, entrance_y + marker_size],
-                            fill='#FF9800', outline='#F57C00', width=2)
-            
-            # Convert to PhotoImage for tkinter
-            self.current_floor_image = ImageTk.PhotoImage(pdf_image)
-            self.image_label.config(image=self.current_floor_image)
-            
-        except Exception as e:
-            self.info_label.config(text=f"Error rendering image: {str(e)}")
-            print(f"Render error: {e}")
+            self.show_floor(found['floor_key'], found['image'])
+        
+        self.place_markers(room, found['entrance'])
+        self.current_result = result
+    
+    def render_floor_image(self, floor_name):
+        """Render a floor fitted into the display area, as a PIL image"""
+        # Render PDF as image with safe scaling; floors are prefetched after
+        # the building loads, so this is usually a cached bitmap
+        floor_image = self.building_manager.render_floor(floor_name, scale=FLOOR_RENDER_SCALE,
+                                                         target_size=FLOOR_DISPLAY_SIZE)
+        if not floor_image:
+            print("Failed to render PDF as image")
+            return None
+        return floor_image
+    
+    def show_floor(self, floor_key, floor_image):
+        """Put a new floor on the canvas; the only place a PhotoImage is made"""
+        # PIL is imported on first use to keep startup fast
+        from PIL import ImageTk
+        
+        # Convert to PhotoImage for tkinter (Tk objects are only made on this thread)
+        self.current_floor_image = ImageTk.PhotoImage(floor_image)
+        self.current_floor_key = floor_key
+        self.floor_canvas.itemconfig(self.floor_item, image=self.current_floor_image)
+    
+    def clear_floor(self):
+        """Remove the floor image and markers from the canvas"""
+        self.floor_canvas.itemconfig(self.floor_item, image='')
+        self.floor_canvas.itemconfig(self.room_marker, state=tk.HIDDEN)
+        self.floor_canvas.itemconfig(self.entrance_marker, state=tk.HIDDEN)
+        self.current_floor_image = None
+        self.current_floor_key = None
+    
+    def place_markers(self, room, entrance=None):
+        """Move the room and entrance markers over the floor image"""
+        print(f"Placing room marker at ({room['x']:.3f}, {room['y']:.3f})")
+        if entrance:
+            print(f"  and entrance marker at ({entrance['x']:.3f}, {entrance['y']:.3f})")
+        
+        # Marker positions are relative to the image, which is centered
+        image_width = self.current_floor_image.width()
+        image_height = self.current_floor_image.height()
+        display_width, display_height = FLOOR_DISPLAY_SIZE
+        left = (display_width - image_width) / 2
+        top = (display_height - image_height) / 2
+        
+        markers = ((self.room_marker, room), (self.entrance_marker, entrance))
+        for marker, label in markers:
+            if not label:
+                self.floor_canvas.itemconfig(marker, state=tk.HIDDEN)
+                continue
+            x = left + label['x'] * image_width
+            y = top + label['y'] * image_height
+            self.floor_canvas.coords(marker, x - MARKER_SIZE, y - MARKER_SIZE,
+                                     x + MARKER_SIZE, y + MARKER_SIZE)
+            self.floor_canvas.itemconfig(marker, state=tk.NORMAL)
+            self.floor_canvas.tag_raise(marker)
     
     def on_closing(self):
         """Clean up when closing app"""
         try:
+            # Let a running job finish before its documents are closed
+            self.jobs.shutdown()
             self.building_manager.close_all()
         except:
             pass
         self.root.destroy()
 
 
+def report_startup_time(app, imports_done, window_created, app_created):
+    """Print how long it took until the building picker was on screen"""
+    app.root.update()
+    shown = time.perf_counter()
+    print("Startup timing (seconds since the first import):")
+    print(f"  imports:            {imports_done - STARTUP_START:.3f}")
+    print(f"  window created:     {window_created - STARTUP_START:.3f}")
+    print(f"  building discovery: {app.discovery_seconds:.3f}")
+    print(f"  app created:        {app_created - STARTUP_START:.3f}")
+    print(f"  picker shown:       {shown - STARTUP_START:.3f}")
+    heavy = [name for name in ('fitz', 'pymupdf', 'PIL', 'numpy') if name in sys.modules]
+    print(f"  heavy modules loaded: {', '.join(heavy) if heavy else 'none'}")
+
+
+def missing_dependencies() -> list:
+    """Packages of REQUIRED_MODULES that are not installed, without importing them"""
+    return [package for module, package in REQUIRED_MODULES.items()
+            if importlib.util.find_spec(module) is None]
+
+
 def main():
     """Main application entry point"""
+    parser = argparse.ArgumentParser(description="Building navigation app")
+    parser.add_argument("--startup-time", action="store_true",
+                        help="Print startup timings once the building picker is shown, then exit")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of processes used to extract floors in parallel (default 1: no parallel extraction)")
+    args = parser.parse_args()
+    imports_done = time.perf_counter()
+    
     root = tk.Tk()
+    window_created = time.perf_counter()
+    
+    missing = missing_dependencies()
+    if missing:
+        messagebox.showerror("Missing Dependencies", 
+                           f"Required Python packages are missing:\n{', '.join(missing)}\n\n"
+                           "Please install requirements:\n"
+                           "pip install PyMuPDF Pillow numpy")
+        root.destroy()
+        return
     
     try:
-        app = BuildingNavigationApp(root)
+        app = BuildingNavigationApp(root, workers=args.workers)
         root.protocol("WM_DELETE_WINDOW", app.on_closing)
+        if args.startup_time:
+            report_startup_time(app, imports_done, window_created, time.perf_counter())
+            app.on_closing()
+            return
         root.mainloop()
-    except ImportError as e:
-        messagebox.showerror("Missing Dependencies", 
-                           f"Required Python packages are missing:\n{str(e)}\n\n"
-                           "Please install requirements:\n"
-                           "pip install PyMuPDF Pillow")
     except Exception as e:
         messagebox.showerror("Application Error", f"An error occurred:\n{str(e)}")
 
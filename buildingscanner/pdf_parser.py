@@ -3,97 +3,320 @@ PDF Parser for Building Navigation
 Extracts text and coordinates from PDF files
 """
 
-import fitz  # PyMuPDF
+import json
 import os
-from typing import List, Dict, Tuple, Optional
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, List, Dict, Tuple, Optional
 import re
 
+from building_index import EntranceIndex, RoomIndex, entrance_floors, ground_floor_first, page_floor_name
+from floor_labels import Label, LabelTable
+
+# Bump whenever is_room_text/is_entrance_text or the extracted fields change,
+# so cached extraction results from older rules are not reused.
+CLASSIFIER_VERSION = 2
+
+# Span labels returned by PDFParser.classify_spans
+ROOM = "room"
+ENTRANCE = "entrance"
+
+# Raw font sizes used for room labels:
+# Stueetage & 1. sal: 3.4 ± 0.1, 2. sal Porcelænshaven: 49.2 ± 0.2
+ROOM_FONT_SIZE_RANGES = ((3.2, 3.6), (49.0, 49.4))
+
+# Area measurements and metadata that are never rooms (checked first)
+_REJECT_PATTERNS = [
+    r'\d+\.\d+m2$',
+    r'(?:Area|Type|Room \d+\.\d+m2):',
+    r'(?=.{7})\d+\.\d+$',  # long decimals (more than 6 characters)
+    r'(?:width|height|scale|rotation|metadata|properties)$',
+]
+
+# Accepted room formats - more permissive patterns
+_ACCEPT_PATTERNS = [
+    r'[A-Z0-9]{1,4}[-._][A-Z0-9]{1,4}',  # Format like "PH-D1", "A-01"
+    r'\d{2}_\d{2}$',                     # Format like "01_02"
+    r'[A-Z]\.\d\.\d{2}$',                # Format like "A.1.01"
+    r'PH-D\d+\.?\d*_?\d*$',               # Format like "PH-D1.11_01"
+    r'[A-Z]{1,2}\d{2,4}$',                # Format like "A101", "AB123"
+    r'\d{2,4}[A-Z]?$',                    # Format like "101", "202A"
+    r'[A-Z0-9]{2,8}$',                    # Short alphanumeric codes
+    r'(?![\d.]+$)[A-Z0-9.-_]{2,10}$',     # Most other codes, but not just numbers and dots
+]
+
+# All rules folded into one compiled pattern so each label is matched in a
+# single pass: no reject pattern may match, then any accept pattern must.
+_ROOM_LABEL_RE = re.compile(
+    r'^(?!%s)(?:%s)' % ('|'.join(_REJECT_PATTERNS), '|'.join(_ACCEPT_PATTERNS)),
+    re.IGNORECASE,
+)
+
+# PyMuPDF (fitz) is imported where it is first used rather than at module
+# level: it is the slowest import by far, and the app should show its
+# building picker before any PDF is opened.
+
+
+def is_room_font_size(font_size: float) -> bool:
+    """Check if a raw font size is one used for room labels"""
+    for min_size, max_size in ROOM_FONT_SIZE_RANGES:
+        if min_size <= font_size <= max_size:
+            return True
+    return False
+
+
+def iter_spans(page, prefilter=None):
+    """Yield (text, font_size, bbox) for every non-empty text span on a page
+    
+    Only text blocks are extracted. If given, prefilter(font_size, raw_text)
+    is called before any string work and spans it rejects are skipped.
+    """
+    import fitz  # PyMuPDF
+    
+    # "dict" extraction flags without TEXT_PRESERVE_IMAGES: image blocks (and
+    # their pixel data) are never built, which is most of the tree on scanned plans.
+    flags = fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES
+    blocks = page.get_text("dict", flags=flags, sort=False)["blocks"]
+    for block in blocks:
+        for line in block.get("lines", ()):
+            for span in line["spans"]:
+                font_size = span["size"]
+                raw_text = span["text"]
+                if prefilter is not None and not prefilter(font_size, raw_text):
+                    continue
+                text = raw_text.strip()
+                if text:
+                    yield text, font_size, span["bbox"]
+
+
+# Straight segments per Bezier curve when drawings are flattened to polylines
+CURVE_STEPS = 8
+
+Point = Tuple[float, float]
+
+
+def _bezier_points(p0, p1, p2, p3, steps: int) -> List[Point]:
+    """Points along a cubic Bezier curve, excluding its start point"""
+    points = []
+    for step in range(1, steps + 1):
+        t = step / steps
+        u = 1 - t
+        a, b, c, d = u * u * u, 3 * u * u * t, 3 * u * t * t, t * t * t
+        points.append((a * p0.x + b * p1.x + c * p2.x + d * p3.x,
+                       a * p0.y + b * p1.y + c * p2.y + d * p3.y))
+    return points
+
+
+def drawing_polylines(items, close_path: bool = False,
+                      curve_steps: int = CURVE_STEPS) -> List[Tuple[List[Point], bool]]:
+    """Flatten the items of one PyMuPDF drawing into (points, closed) polylines
+    
+    Lines and curves that continue where the previous item ended are joined
+    into one polyline; rectangles and quads are closed polylines of their own.
+    """
+    polylines: List[Tuple[List[Point], bool]] = []
+    current: List[Point] = []
+    
+    def finish():
+        if len(current) > 1:
+            polylines.append((list(current), False))
+        current.clear()
+    
+    for item in items:
+        kind = item[0]
+        if kind in ("l", "c"):
+            start = (item[1].x, item[1].y)
+            if not current or current[-1] != start:
+                finish()
+                current.append(start)
+            if kind == "l":
+                current.append((item[2].x, item[2].y))
+            else:
+                current.extend(_bezier_points(item[1], item[2], item[3], item[4], curve_steps))
+        elif kind == "re":
+            finish()
+            rect = item[1]
+            polylines.append(([(rect.x0, rect.y0), (rect.x1, rect.y0),
+                               (rect.x1, rect.y1), (rect.x0, rect.y1)], True))
+        elif kind == "qu":
+            finish()
+            quad = item[1]
+            polylines.append(([(quad.ul.x, quad.ul.y), (quad.ur.x, quad.ur.y),
+                               (quad.lr.x, quad.lr.y), (quad.ll.x, quad.ll.y)], True))
+    finish()
+    
+    if close_path and polylines and not polylines[-1][1]:
+        polylines[-1] = (polylines[-1][0], True)
+    return polylines
+
+
+class DocumentPool:
+    """Bounded pool of open fitz documents with least-recently-used eviction
+    
+    Parsers created with a pool don't own their document: every access goes
+    through get(), which reopens the PDF if it was evicted in the meantime.
+    """
+    
+    def __init__(self, max_open: int = 8):
+        self.max_open = max(1, max_open)
+        self._docs = OrderedDict()  # pdf_path -> fitz.Document, oldest first
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, pdf_path: str):
+        """Return the open document for pdf_path, opening it if needed"""
+        with self._lock:
+            doc = self._docs.get(pdf_path)
+            if doc is not None:
+                self._docs.move_to_end(pdf_path)
+                self.hits += 1
+                return doc
+            
+            self.misses += 1
+            import fitz  # PyMuPDF
+            doc = fitz.open(pdf_path)
+            self._docs[pdf_path] = doc
+            while len(self._docs) > self.max_open:
+                _, oldest = self._docs.popitem(last=False)
+                oldest.close()
+                self.evictions += 1
+            return doc
+    
+    def release(self, pdf_path: str):
+        """Close the document for pdf_path if it is open"""
+        with self._lock:
+            doc = self._docs.pop(pdf_path, None)
+            if doc is not None:
+                doc.close()
+    
+    def close_all(self):
+        """Close every open document"""
+        with self._lock:
+            while self._docs:
+                _, doc = self._docs.popitem()
+                doc.close()
+    
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters and current pool size"""
+        with self._lock:
+            return {
+                'open': len(self._docs),
+                'max_open': self.max_open,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
 class PDFParser:
-    def __init__(self, pdf_path: str):
+    def __init__(self, pdf_path: str, pool: Optional[DocumentPool] = None, page_number: int = 0):
         self.pdf_path = pdf_path
-        self.doc = None
+        self.pool = pool
+        # Page of the PDF this parser extracts and renders
+        self.page_number = page_number
+        self._doc = None
+        self._owns_doc = True
+        self._loaded = False
         self.rooms = []
         self.entrances = []
+    
+    @property
+    def doc(self):
+        """The open fitz document, or None if not loaded"""
+        if self.pool is not None and self._loaded:
+            return self.pool.get(self.pdf_path)
+        return self._doc
         
     def load_pdf(self) -> bool:
         """Load PDF document"""
         try:
-            self.doc = fitz.open(self.pdf_path)
+            if self.pool is not None:
+                self.pool.get(self.pdf_path)
+            else:
+                import fitz  # PyMuPDF
+                self._doc = fitz.open(self.pdf_path)
+            self._loaded = True
             return True
         except Exception as e:
             print(f"Error loading PDF {self.pdf_path}: {e}")
             return False
     
+    @property
+    def page_count(self) -> int:
+        """Number of pages in the loaded PDF"""
+        try:
+            doc = self.doc
+        except Exception as e:
+            print(f"Error reopening {self.pdf_path}: {e}")
+            return 0
+        return len(doc) if doc else 0
+    
+    def for_page(self, page_number: int) -> 'PDFParser':
+        """Parser for another page of the same, already loaded PDF
+        
+        The document is shared rather than reopened; only this parser's
+        owner (or the pool) closes it.
+        """
+        sibling = PDFParser(self.pdf_path, pool=self.pool, page_number=page_number)
+        sibling._doc = self._doc
+        sibling._owns_doc = False
+        sibling._loaded = self._loaded
+        return sibling
+    
     def is_room_text(self, text: str, font_size: float = 0, normalized_font_size: float = 0) -> bool:
         """Check if text looks like a room identifier"""
         if not text or len(text) < 1:
             return False
             
-        # Check specific font sizes for different floors:
-        # Stueetage & 1. sal: 3.4 ± 0.1 (raw font size)
-        # 2. sal: 49.2 ± 0.1 (raw font size)
-        
-        is_valid_font_size = False
-        
-        # Check for normal room font size (3.3-3.5 range for most floors)
-        if 3.2 <= font_size <= 3.6:
-            is_valid_font_size = True
-        # Check for 2. sal Porcelænshaven font size (49.2 ± 0.2)  
-        elif 49.0 <= font_size <= 49.4:
-            is_valid_font_size = True
-            
-        if not is_valid_font_size:
-            return False
-            
-        # Skip area measurements and metadata
-        if re.match(r'^\d+\.\d+m2$', text, re.IGNORECASE):
-            return False
-        if re.match(r'^(Area|Type|Room \d+\.\d+m2):', text, re.IGNORECASE):
-            return False
-        if re.match(r'^\d+\.\d+$', text) and len(text) > 6:
-            return False
-        if re.match(r'^(width|height|scale|rotation|metadata|properties)$', text, re.IGNORECASE):
+        if not is_room_font_size(font_size):
             return False
         
-        # Accept room formats - more permissive patterns
-        if re.match(r'^[A-Z0-9]{1,4}[-._][A-Z0-9]{1,4}', text, re.IGNORECASE):
-            return True  # Format like "PH-D1", "A-01"
-        if re.match(r'^\d{2}_\d{2}$', text):
-            return True  # Format like "01_02"
-        if re.match(r'^[A-Z]\.\d\.\d{2}$', text, re.IGNORECASE):
-            return True  # Format like "A.1.01"
-        if re.match(r'^PH-D\d+\.?\d*_?\d*$', text, re.IGNORECASE):
-            return True  # Format like "PH-D1.11_01"
-        if re.match(r'^[A-Z]{1,2}\d{2,4}$', text, re.IGNORECASE):
-            return True  # Format like "A101", "AB123"
-        if re.match(r'^\d{2,4}[A-Z]?$', text, re.IGNORECASE):
-            return True  # Format like "101", "202A"
-        if re.match(r'^[A-Z0-9]{2,8}$', text, re.IGNORECASE):
-            return True  # Short alphanumeric codes
-        
-        # Be more inclusive - accept most alphanumeric combinations that could be room numbers
-        if re.match(r'^[A-Z0-9.-_]{2,10}$', text, re.IGNORECASE):
-            # But exclude obvious non-rooms
-            if not re.match(r'^[\d.]+$', text):  # Not just numbers and dots
-                return True
-            
-        return False
+        return _ROOM_LABEL_RE.match(text) is not None
     
     def is_entrance_text(self, text: str) -> bool:
         """Check if text indicates an entrance"""
         return 'indgang' in text.lower()
     
-    def extract_text_with_coordinates(self) -> Tuple[List[Dict], List[Dict]]:
+    def is_label_candidate(self, font_size: float, text: str) -> bool:
+        """Cheap span prefilter: room-sized text, or text that may be an entrance
+        
+        Entrances are matched on text alone, so off-size spans still get the
+        substring check; everything else is dropped before strip() and regex work.
+        """
+        return is_room_font_size(font_size) or self.is_entrance_text(text)
+    
+    def classify_spans(self, spans) -> List[Optional[str]]:
+        """Label each (text, font_size, bbox) span as ROOM, ENTRANCE or None
+        
+        Entrances are checked first, so an entrance label is never a room.
+        """
+        labels = []
+        for text, font_size, _ in spans:
+            if self.is_entrance_text(text):
+                labels.append(ENTRANCE)
+            elif self.is_room_text(text, font_size):
+                labels.append(ROOM)
+            else:
+                labels.append(None)
+        return labels
+    
+    def extract_text_with_coordinates(self) -> Tuple[LabelTable, LabelTable]:
         """Extract room and entrance data with coordinates"""
-        if not self.doc:
-            return [], []
-            
-        rooms = []
-        entrances = []
+        rooms = LabelTable(with_ids=True)
+        entrances = LabelTable(with_ids=False)
         
         try:
-            # Get first page
-            page = self.doc[0]
+            # With a pool, self.doc may reopen an evicted PDF, which can fail
+            doc = self.doc
+            if not doc:
+                return rooms, entrances
+            
+            page = doc[self.page_number]
             page_rect = page.rect
             
             # Calculate normalization factor based on page size
@@ -101,56 +324,31 @@ class PDFParser:
             reference_size = 595 * 842
             actual_size = page_rect.width * page_rect.height
             size_scale_factor = (actual_size / reference_size) ** 0.5
+            rooms.size_scale_factor = size_scale_factor
+            entrances.size_scale_factor = size_scale_factor
             
             print(f"PDF size: {page_rect.width:.0f}x{page_rect.height:.0f}, scale factor: {size_scale_factor:.2f}")
             
-            # Get text blocks with positioning
-            text_dict = page.get_text("dict")
+            # Stream candidate text spans with positioning
+            spans = list(iter_spans(page, prefilter=self.is_label_candidate))
             
-            for block in text_dict["blocks"]:
-                if "lines" not in block:
+            for (text, font_size, bbox), label in zip(spans, self.classify_spans(spans)):
+                if label is None:
                     continue
-                    
-                for line in block["lines"]:
-                    for span in line["spans"]:
-                        text = span["text"].strip()
-                        if not text:
-                            continue
-                            
-                        # Get font size and position
-                        font_size = span["size"]
-                        bbox = span["bbox"]  # (x0, y0, x1, y1)
-                        
-                        # Normalize font size based on page scale
-                        normalized_font_size = font_size / size_scale_factor
-                        
-                        # Calculate center position
-                        x = (bbox[0] + bbox[2]) / 2
-                        y = (bbox[1] + bbox[3]) / 2
-                        
-                        # Normalize coordinates (0-1 range)
-                        norm_x = x / page_rect.width
-                        norm_y = y / page_rect.height
-                        
-                        # Check if it's an entrance FIRST (before room check)
-                        if self.is_entrance_text(text):
-                            entrances.append({
-                                'text': text,
-                                'x': norm_x,
-                                'y': norm_y,
-                                'font_size': font_size,
-                                'normalized_font_size': normalized_font_size
-                            })
-                        # Check if it's a room (but not if it's already an entrance)
-                        elif self.is_room_text(text, font_size, normalized_font_size):
-                            rooms.append({
-                                'id': text.upper(),  # Normalize to uppercase
-                                'text': text,
-                                'x': norm_x,
-                                'y': norm_y,
-                                'font_size': font_size,
-                                'normalized_font_size': normalized_font_size
-                            })
+                
+                # Calculate center position
+                x = (bbox[0] + bbox[2]) / 2
+                y = (bbox[1] + bbox[3]) / 2
+                
+                # Normalize coordinates (0-1 range); the normalized font size
+                # is derived from the table's size_scale_factor on access
+                norm_x = x / page_rect.width
+                norm_y = y / page_rect.height
+                
+                if label == ENTRANCE:
+                    entrances.append(text, norm_x, norm_y, font_size)
+                else:
+                    rooms.append(text, norm_x, norm_y, font_size)
             
             print(f"Extracted from {os.path.basename(self.pdf_path)}: {len(rooms)} rooms, {len(entrances)} entrances")
             
@@ -159,28 +357,107 @@ class PDFParser:
             
         return rooms, entrances
     
+    def extract_drawings(self, curve_steps: int = CURVE_STEPS) -> List[Dict]:
+        """Vector paths of the page, flattened to polylines in page coordinates
+        
+        Each path is a dict with its style ('stroke' and 'fill' RGB tuples or
+        None, 'width', 'stroke_opacity', 'fill_opacity', 'even_odd') and
+        'polylines', a list of (points, closed). Paths keep the page's
+        painting order.
+        """
+        paths = []
+        try:
+            doc = self.doc
+            if not doc:
+                return paths
+            
+            for drawing in doc[self.page_number].get_drawings():
+                polylines = drawing_polylines(drawing["items"], bool(drawing.get("closePath")),
+                                              curve_steps)
+                if not polylines:
+                    continue
+                paths.append({
+                    "stroke": drawing.get("color"),
+                    "fill": drawing.get("fill"),
+                    "width": drawing.get("width"),
+                    "stroke_opacity": drawing.get("stroke_opacity"),
+                    "fill_opacity": drawing.get("fill_opacity"),
+                    "even_odd": bool(drawing.get("even_odd")),
+                    "polylines": polylines,
+                })
+        except Exception as e:
+            print(f"Error extracting drawings from {self.pdf_path}: {e}")
+        return paths
+    
+    def extract_text_runs(self) -> List[Dict]:
+        """Every text span with its baseline origin, direction, size and colour
+        
+        The drawing API leaves text out, so this is what carries room
+        numbers into a vector export.
+        """
+        import fitz  # PyMuPDF
+        
+        runs = []
+        try:
+            doc = self.doc
+            if not doc:
+                return runs
+            
+            flags = fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES
+            blocks = doc[self.page_number].get_text("dict", flags=flags, sort=False)["blocks"]
+            for block in blocks:
+                for line in block.get("lines", ()):
+                    for span in line["spans"]:
+                        if not span["text"].strip():
+                            continue
+                        runs.append({
+                            "text": span["text"],
+                            "origin": span["origin"],
+                            "dir": line["dir"],
+                            "size": span["size"],
+                            "color": span["color"],
+                        })
+        except Exception as e:
+            print(f"Error extracting text runs from {self.pdf_path}: {e}")
+        return runs
+    
     def get_pdf_dimensions(self) -> Tuple[float, float]:
         """Get PDF page dimensions"""
-        if not self.doc:
-            return 0, 0
+        try:
+            doc = self.doc
+            if not doc:
+                return 0, 0
             
-        page = self.doc[0]
-        rect = page.rect
-        return rect.width, rect.height
+            rect = doc[self.page_number].rect
+            return rect.width, rect.height
+        except Exception as e:
+            print(f"Error reading page size of {self.pdf_path}: {e}")
+            return 0, 0
     
-    def render_pdf_as_image(self, scale: float = 1.0):
-        """Render PDF page as PIL Image with size limits"""
-        if not self.doc:
-            print("Error: No PDF document loaded")
-            return None
-            
+    def render_pdf_as_image(self, scale: float = 1.0, target_size: Optional[Tuple[int, int]] = None,
+                            max_dimension: int = 2000):
+        """Render PDF page as PIL Image with size limits
+        
+        With target_size (width, height) the page is rendered directly at
+        the scale that fits it into that box, instead of rendering large
+        and resizing afterwards. The longer side never exceeds max_dimension.
+        """
         try:
-            page = self.doc[0]
+            doc = self.doc
+            if not doc:
+                print("Error: No PDF document loaded")
+                return None
+            
+            import fitz  # PyMuPDF
+            
+            page = doc[self.page_number]
             page_rect = page.rect
             
+            if target_size is not None:
+                target_width, target_height = target_size
+                scale = min(target_width / page_rect.width, target_height / page_rect.height)
+            
             # Calculate appropriate scale to avoid huge images
-            # Target max dimension: 2000 pixels
-            max_dimension = 2000
             width_scale = max_dimension / page_rect.width
             height_scale = max_dimension / page_rect.height
             safe_scale = min(width_scale, height_scale, scale)
@@ -193,7 +470,6 @@ class PDFParser:
             
             # Convert to PIL Image with size check
             from PIL import Image
-            import io
             
             # Check pixmap size before conversion
             pix_size = pix.width * pix.height
@@ -207,9 +483,9 @@ class PDFParser:
                 mat = fitz.Matrix(safe_scale, safe_scale)
                 pix = page.get_pixmap(matrix=mat)
             
-            # Convert to PNG bytes
-            img_data = pix.tobytes("png")
-            image = Image.open(io.BytesIO(img_data))
+            # Hand the raw samples straight to PIL (no PNG encode/decode)
+            mode = "RGBA" if pix.alpha else "RGB"
+            image = Image.frombytes(mode, (pix.width, pix.height), pix.samples)
             print(f"Successfully rendered PDF as {image.size[0]}x{image.size[1]} image")
             return image
             
@@ -219,26 +495,104 @@ class PDFParser:
     
     def close(self):
         """Close PDF document"""
-        if self.doc:
-            self.doc.close()
-            self.doc = None
+        if self.pool is not None:
+            if self._loaded:
+                self.pool.release(self.pdf_path)
+        elif self._doc is not None:
+            if self._owns_doc:
+                self._doc.close()
+            self._doc = None
+        self._loaded = False
+
+
+def extract_floor(pdf_path: str, page_number: int = 0) -> Optional[Tuple[LabelTable, LabelTable]]:
+    """Extract rooms and entrances from a floor PDF page in a fresh parser.
+
+    Module-level so it can be pickled into a process pool worker.
+    Returns None if the PDF could not be opened.
+    """
+    parser = PDFParser(pdf_path, page_number=page_number)
+    if not parser.load_pdf():
+        return None
+    try:
+        return parser.extract_text_with_coordinates()
+    finally:
+        parser.close()
+
+
+# progress(floor_name, floors_done, floors_total), called as floors are extracted
+ProgressCallback = Callable[[str, int, int], None]
+
+# How long render prefetching waits while a foreground call needs PyMuPDF
+PREFETCH_YIELD_SECONDS = 0.01
+
+BUILDING_MANIFEST_VERSION = 1
 
 
 class BuildingManager:
     """Manages multiple buildings with PDF files for different floors"""
     
-    def __init__(self, buildings_base_path: str):
+    def __init__(self, buildings_base_path: str, max_workers: int = 1, cache=None,
+                 max_open_documents: Optional[int] = None, lazy_extraction: bool = False,
+                 render_cache=None,
+                 prefetch_render: Optional[Tuple[float, Optional[Tuple[int, int]]]] = None,
+                 prefetch_max_bytes: Optional[int] = None,
+                 prefetch_order: Callable[[List[str]], List[str]] = ground_floor_first,
+                 building_manifest: Optional[str] = None):
         self.buildings_base_path = buildings_base_path
+        # Optional path of a generated JSON list of buildings, read by
+        # get_available_buildings instead of scanning every building folder
+        self.building_manifest = building_manifest
+        # Floors are extracted in a process pool when max_workers > 1.
+        # Processes rather than threads: PyMuPDF is not thread-safe and
+        # holds the GIL during text extraction anyway.
+        self.max_workers = max_workers
+        # Optional ExtractionCache; floors whose PDF is unchanged skip extraction
+        self.cache = cache
+        # With max_open_documents set, floor parsers share a bounded pool
+        # instead of each keeping its PDF open until close_all()
+        self.document_pool = DocumentPool(max_open_documents) if max_open_documents else None
+        # With lazy_extraction, load_building_floors only opens the PDFs; each
+        # floor (page) is extracted the first time a query needs it
+        self.lazy_extraction = lazy_extraction
+        # Optional RenderCache of floor bitmaps used by render_floor()
+        self.render_cache = render_cache
+        # With prefetch_render = (scale, target_size) and a render cache, every
+        # floor is rendered in a background thread after a building loads, in
+        # prefetch_order, until the cache holds prefetch_max_bytes (default:
+        # half the cache, so prefetching never evicts what searches used)
+        self.prefetch_render = prefetch_render
+        self.prefetch_max_bytes = prefetch_max_bytes
+        self.prefetch_order = prefetch_order
+        self._prefetch_thread = None
+        self._prefetch_stop = threading.Event()
+        # PyMuPDF is not thread-safe: calls that touch documents hold this lock,
+        # and prefetching waits while a foreground call is waiting for it
+        self._pdf_lock = threading.RLock()
+        self._foreground_waiting = 0
+        self._waiting_lock = threading.Lock()
         self.available_buildings = []
         self.current_building = None
         self.floors = {}
         self.all_rooms = {}  # floor_name -> rooms
         self.all_entrances = {}  # floor_name -> entrances
+        self.room_index = RoomIndex({})
+        self.entrance_index = EntranceIndex({})
     def get_available_buildings(self):
-        """Scan for available buildings in the bygninger folder"""
+        """Scan for available buildings in the bygninger folder
+        
+        With a building manifest, the scan only runs when the manifest is
+        missing or stale, and its result is written back to the manifest.
+        """
         if not os.path.exists(self.buildings_base_path):
             print(f"Error: Buildings path {self.buildings_base_path} does not exist")
             return []
+        
+        if self.building_manifest is not None:
+            buildings = self._read_building_manifest()
+            if buildings is not None:
+                self.available_buildings = buildings
+                return buildings
             
         buildings = []
         try:
@@ -253,20 +607,66 @@ class BuildingManager:
             print(f"Error scanning buildings: {e}")
             
         self.available_buildings = buildings
+        if self.building_manifest is not None:
+            self._write_building_manifest(buildings)
         return buildings
     
-    def load_building_floors(self, building_name: str):
-        """Load all PDF files from the specified building folder"""
+    def _building_mtimes(self, buildings: List[str]) -> Dict[str, int]:
+        """Modification times of the base folder ('') and each building folder
+        
+        Adding or removing a building changes the base folder's mtime, and
+        adding or removing a PDF changes its building folder's.
+        """
+        mtimes = {'': os.stat(self.buildings_base_path).st_mtime_ns}
+        for building in buildings:
+            mtimes[building] = os.stat(os.path.join(self.buildings_base_path, building)).st_mtime_ns
+        return mtimes
+    
+    def _read_building_manifest(self) -> Optional[List[str]]:
+        """Buildings listed in the manifest, or None if it is missing or stale"""
+        try:
+            with open(self.building_manifest, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if (manifest["version"] != BUILDING_MANIFEST_VERSION
+                    or manifest["base_path"] != os.path.abspath(self.buildings_base_path)):
+                return None
+            buildings = manifest["buildings"]
+            if self._building_mtimes(buildings) != manifest["mtimes"]:
+                return None
+            return buildings
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+    
+    def _write_building_manifest(self, buildings: List[str]):
+        """Record the scanned buildings and their folder mtimes"""
+        try:
+            manifest = {
+                "version": BUILDING_MANIFEST_VERSION,
+                "base_path": os.path.abspath(self.buildings_base_path),
+                "buildings": buildings,
+                "mtimes": self._building_mtimes(buildings),
+            }
+            os.makedirs(os.path.dirname(os.path.abspath(self.building_manifest)), exist_ok=True)
+            tmp_path = f"{self.building_manifest}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.building_manifest)
+        except OSError as e:
+            print(f"Warning: could not write building manifest {self.building_manifest}: {e}")
+    
+    def load_building_floors(self, building_name: str, progress: Optional[ProgressCallback] = None):
+        """Load all PDF files from the specified building folder
+        
+        progress, if given, is called after each floor is extracted.
+        """
         building_path = os.path.join(self.buildings_base_path, building_name)
         
         if not os.path.exists(building_path):
             print(f"Error: Building path {building_path} does not exist")
             return False
-            
+        
         # Clear previous data
-        self.floors.clear()
-        self.all_rooms.clear() 
-        self.all_entrances.clear()
+        self.release_building()
         
         # Get all PDF files in the building directory
         try:
@@ -276,79 +676,351 @@ class BuildingManager:
             print(f"Loading building: {building_name}")
             
             for filename in pdf_files:
-                pdf_path = os.path.join(building_path, filename)
-                
                 # Use filename (without .pdf) as floor name
-                floor_name = os.path.splitext(filename)[0]
-                
-                print(f"Loading floor: {floor_name}")
-                parser = PDFParser(pdf_path)
-                
-                if parser.load_pdf():
-                    rooms, entrances = parser.extract_text_with_coordinates()
-                    
-                    self.floors[floor_name] = parser
-                    self.all_rooms[floor_name] = rooms
-                    self.all_entrances[floor_name] = entrances
-                    
-                    print(f"  -> {len(rooms)} rooms, {len(entrances)} entrances")
-                else:
-                    print(f"  -> Failed to load PDF")
+                self._open_floor_pdf(os.path.splitext(filename)[0],
+                                     os.path.join(building_path, filename))
+            
+            if not self.lazy_extraction:
+                self.ensure_floors_extracted(progress=progress)
                     
         except Exception as e:
             print(f"Error loading building {building_name}: {e}")
             return False
         
         self.current_building = building_name
+        if self.floors and self.prefetch_render is not None:
+            self.prefetch_floors(*self.prefetch_render)
         return len(self.floors) > 0
     
-    def search_room(self, room_query: str) -> Optional[Dict]:
-        """Search for a room across all floors (case insensitive, exact match)"""
-        room_query = room_query.upper().strip()
+    def release_building(self):
+        """Close the current building's documents and drop its floors and labels"""
+        self.stop_prefetch()
+        for parser in self.floors.values():
+            parser.close()
+        self.floors.clear()
+        self.all_rooms.clear()
+        self.all_entrances.clear()
+        self.room_index = RoomIndex({})
+        self.entrance_index = EntranceIndex({})
+        self.current_building = None
+    
+    def _open_floor_pdf(self, floor_name: str, pdf_path: str):
+        """Register the floor(s) of one PDF without extracting them
         
-        for floor_name, rooms in self.all_rooms.items():
-            for room in rooms:
-                if room['id'] == room_query:
-                    return {
-                        'room': room,
-                        'floor': floor_name,
-                        'parser': self.floors[floor_name]
-                    }
+        A single-page PDF is one floor. A multi-page PDF becomes one floor
+        per page, named <file>_p<page>, sharing the open document.
+        """
+        print(f"Loading floor: {floor_name}")
+        parser = PDFParser(pdf_path, pool=self.document_pool)
         
-        return None
+        if not parser.load_pdf():
+            print(f"  -> Failed to load PDF")
+            return
+        
+        page_count = parser.page_count
+        if page_count <= 1:
+            self.floors[floor_name] = parser
+            return
+        
+        print(f"  -> {page_count} pages, one floor per page")
+        for page_number in range(page_count):
+            page_parser = parser if page_number == 0 else parser.for_page(page_number)
+            self.floors[page_floor_name(floor_name, page_number)] = page_parser
+    
+    def pending_floors(self) -> List[str]:
+        """Floors that are open but not extracted yet"""
+        return [floor_name for floor_name in self.floors if floor_name not in self.all_rooms]
+    
+    def ensure_floors_extracted(self, floor_names: Optional[List[str]] = None,
+                                progress: Optional[ProgressCallback] = None):
+        """Extract the given floors (default: all) if they haven't been yet
+        
+        Extraction results are taken from the cache when possible. Cache
+        misses are extracted in a process pool when max_workers > 1,
+        otherwise inline with the parser that is kept for rendering.
+        progress is called once per floor, as soon as its labels are ready.
+        """
+        if floor_names is None:
+            floor_names = self.floors
+        pending = [floor_name for floor_name in floor_names
+                   if floor_name in self.floors and floor_name not in self.all_rooms]
+        if not pending:
+            return
+        
+        cache_keys = {}
+        cached = {}
+        
+        if self.cache is not None:
+            for floor_name in pending:
+                parser = self.floors[floor_name]
+                try:
+                    cache_keys[floor_name] = self.cache.key_for(parser.pdf_path, parser.page_number)
+                except OSError as e:
+                    print(f"Warning: could not hash {parser.pdf_path}: {e}")
+                    continue
+                result = self.cache.get(cache_keys[floor_name])
+                if result is not None:
+                    cached[floor_name] = result
+        
+        reported = set()
+        
+        def report(floor_name):
+            if progress is not None and floor_name not in reported:
+                reported.add(floor_name)
+                progress(floor_name, len(reported), len(pending))
+        
+        misses = [floor_name for floor_name in pending if floor_name not in cached]
+        extracted = {}
+        if self.max_workers > 1 and len(misses) > 1:
+            extracted = self._extract_parallel(misses, on_result=report)
+        
+        for floor_name in pending:
+            if floor_name in cached:
+                print(f"Extracting floor: {floor_name} (cached)")
+                rooms, entrances = cached[floor_name]
+            else:
+                print(f"Extracting floor: {floor_name}")
+                result = extracted.get(floor_name)
+                if result is None:
+                    # Not sent to a worker, or the worker could not open the PDF
+                    with self._foreground_pdf_access():
+                        result = self.floors[floor_name].extract_text_with_coordinates()
+                
+                rooms, entrances = result
+                if floor_name in cache_keys:
+                    self.cache.put(cache_keys[floor_name], rooms, entrances)
+            
+            self.all_rooms[floor_name] = rooms
+            self.all_entrances[floor_name] = entrances
+            print(f"  -> {len(rooms)} rooms, {len(entrances)} entrances")
+            report(floor_name)
+        
+        # Keep the label dicts in floor order however floors were extracted
+        for labels in (self.all_rooms, self.all_entrances):
+            ordered = [(floor_name, labels[floor_name]) for floor_name in self.floors if floor_name in labels]
+            labels.clear()
+            labels.update(ordered)
+        
+        self.room_index = RoomIndex(self.all_rooms)
+        self.entrance_index = EntranceIndex(self.all_entrances)
+    
+    def get_floor_labels(self, floor_name: str) -> Tuple[LabelTable, LabelTable]:
+        """Rooms and entrances of one floor, extracting it on first use"""
+        self.ensure_floors_extracted([floor_name])
+        return self.all_rooms[floor_name], self.all_entrances[floor_name]
+    
+    def _extract_parallel(self, floor_names: List[str],
+                          on_result: Optional[Callable[[str], None]] = None
+                          ) -> Dict[str, Optional[Tuple[LabelTable, LabelTable]]]:
+        """Extract several floors at once in a process pool
+        
+        on_result is called with each floor name as its worker finishes.
+        Floors missing from the result are left to the caller to extract
+        serially; that happens for all of them if the pool cannot start or
+        breaks (e.g. no process spawning in a frozen or sandboxed app), and
+        parallel extraction is then turned off for this manager.
+        """
+        workers = min(self.max_workers, len(floor_names))
+        print(f"Extracting {len(floor_names)} floors with {workers} workers")
+        
+        results = {}
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = {}
+                for floor_name in floor_names:
+                    parser = self.floors[floor_name]
+                    future = executor.submit(extract_floor, parser.pdf_path, parser.page_number)
+                    futures[future] = floor_name
+                
+                for future in as_completed(futures):
+                    floor_name = futures[future]
+                    results[floor_name] = future.result()
+                    if on_result is not None and results[floor_name] is not None:
+                        on_result(floor_name)
+        except (BrokenProcessPool, OSError, NotImplementedError) as e:
+            print(f"Parallel extraction failed ({e}); extracting the remaining floors serially")
+            self.max_workers = 1
+        return results
+    
+    def _room_result(self, floor_name: str, index: int) -> Dict:
+        return {
+            'room': self.all_rooms[floor_name][index],
+            'floor': floor_name,
+            'parser': self.floors[floor_name]
+        }
+    
+    def search_room(self, room_query: str) -> Optional[Dict]:
+        """Search for a room across all floors (case insensitive, exact match)"""
+        self.ensure_floors_extracted()
+        hits = self.room_index.lookup(room_query)
+        if not hits:
+            return None
+        return self._room_result(*hits[0])
     
-    def get_nearest_entrance(self, room_x: float, room_y: float) -> Optional[Dict]:
+    def search_rooms(self, room_query: str) -> List[Dict]:
+        """All exact matches for a room across floors, in floor order"""
+        self.ensure_floors_extracted()
+        return [self._room_result(floor_name, index)
+                for floor_name, index in self.room_index.lookup(room_query)]
+    
+    def search_room_prefix(self, prefix: str, limit: Optional[int] = None) -> List[Dict]:
+        """Rooms whose ID starts with prefix, sorted by ID (for autocomplete)"""
+        self.ensure_floors_extracted()
+        return [self._room_result(floor_name, index)
+                for floor_name, index in self.room_index.lookup_prefix(prefix, limit)]
+    
+    def get_nearest_entrance(self, room_x: float, room_y: float) -> Optional[Label]:
         """Find nearest entrance (prefer ground floor if available)"""
-        # Try to find ground floor entrances first
-        ground_floor_candidates = []
-        for floor_name in self.all_entrances.keys():
-            if any(keyword in floor_name.lower() for keyword in ['stue', 'ground', '0']):
-                ground_floor_candidates.append(floor_name)
+        self._ensure_entrance_floors()
+        return self.entrance_index.nearest(room_x, room_y)
+    
+    def get_nearest_entrances(self, room_x: float, room_y: float, k: int = 3) -> List[Label]:
+        """Up to k nearest entrances, nearest first"""
+        self._ensure_entrance_floors()
+        return self.entrance_index.k_nearest(room_x, room_y, k)
+    
+    def get_nearest_entrances_batch(self, xs, ys) -> List[Optional[Label]]:
+        """Nearest entrance for many positions at once (vectorized)"""
+        self._ensure_entrance_floors()
+        index = self.entrance_index
+        return [index.label(point) if point >= 0 else None
+                for point in index.nearest_batch(xs, ys).tolist()]
+    
+    def _ensure_entrance_floors(self):
+        """Extract just the floors whose entrances are used (usually the ground floor)"""
+        self.ensure_floors_extracted(entrance_floors(list(self.floors)))
+    
+    def get_room_entrances(self) -> Dict[str, List[Optional[Label]]]:
+        """Nearest entrance for every room of the building, per floor"""
+        self.ensure_floors_extracted()
+        return {floor_name: self.get_nearest_entrances_batch(rooms.xs, rooms.ys)
+                for floor_name, rooms in self.all_rooms.items()}
+    
+    def render_floor(self, floor_name: str, scale: float = 1.0,
+                     target_size: Optional[Tuple[int, int]] = None):
+        """Render a floor as a PIL Image, optionally fitted into target_size
         
-        # If no obvious ground floor, use first floor with entrances
-        target_floors = ground_floor_candidates if ground_floor_candidates else list(self.all_entrances.keys())
+        With a render cache, repeat renders of the same floor, scale and
+        target size are served from memory. The returned image may be
+        shared with the cache, so draw on a copy().
+        """
+        parser = self.floors.get(floor_name)
+        if parser is None:
+            return None
         
-        all_entrances = []
-        for floor_name in target_floors:
-            if self.all_entrances[floor_name]:
-                all_entrances.extend(self.all_entrances[floor_name])
+        key = (parser.pdf_path, parser.page_number, scale, target_size)
+        if self.render_cache is not None:
+            image = self.render_cache.get(key)
+            if image is not None:
+                return image
         
-        if not all_entrances:
+        with self._foreground_pdf_access():
+            return self._render_floor(parser, key, scale, target_size)
+    
+    def _render_floor(self, parser: PDFParser, key: Tuple, scale: float,
+                      target_size: Optional[Tuple[int, int]]):
+        """Render and cache one floor; the caller holds the PyMuPDF lock"""
+        if self.render_cache is not None:
+            # Another thread may have rendered it while we waited for the lock;
+            # render_floor already counted this lookup
+            image = self.render_cache.peek(key)
+            if image is not None:
+                return image
+        
+        image = parser.render_pdf_as_image(scale=scale, target_size=target_size)
+        if image is None:
             return None
+        
+        if target_size is not None and (image.size[0] > target_size[0] or image.size[1] > target_size[1]):
+            # Pixmap bounds are rounded outwards; trim a pixel of overshoot
+            from PIL import Image
             
-        # Find closest entrance using Euclidean distance
-        min_distance = float('inf')
-        nearest_entrance = None
+            target_width, target_height = target_size
+            fit = min(target_width / image.size[0], target_height / image.size[1])
+            new_size = (int(image.size[0] * fit), int(image.size[1] * fit))
+            image = image.resize(new_size, Image.Resampling.LANCZOS)
         
-        for entrance in all_entrances:
-            distance = ((entrance['x'] - room_x) ** 2 + (entrance['y'] - room_y) ** 2) ** 0.5
-            if distance < min_distance:
-                min_distance = distance
-                nearest_entrance = entrance
-                
-        return nearest_entrance
+        if self.render_cache is not None:
+            self.render_cache.put(key, image)
+        return image
+    
+    @contextmanager
+    def _foreground_pdf_access(self):
+        """Hold the PyMuPDF lock for a foreground call; prefetching yields to it"""
+        with self._waiting_lock:
+            self._foreground_waiting += 1
+        try:
+            with self._pdf_lock:
+                yield
+        finally:
+            with self._waiting_lock:
+                self._foreground_waiting -= 1
+    
+    def prefetch_floors(self, scale: float = 1.0, target_size: Optional[Tuple[int, int]] = None,
+                        max_bytes: Optional[int] = None):
+        """Start rendering every floor into the render cache in the background
+        
+        Floors are rendered one at a time in prefetch_order, each only when
+        no foreground call is waiting for PyMuPDF, so searches are never
+        queued behind more than one prefetch render.
+        """
+        if self.render_cache is None:
+            return
+        self.stop_prefetch()
+        
+        if max_bytes is None:
+            max_bytes = self.prefetch_max_bytes
+        if max_bytes is None:
+            max_bytes = self.render_cache.max_bytes // 2
+        
+        floors = [(floor_name, self.floors[floor_name])
+                  for floor_name in self.prefetch_order(list(self.floors))]
+        self._prefetch_stop = threading.Event()
+        self._prefetch_thread = threading.Thread(
+            target=self._prefetch_worker,
+            args=(floors, scale, target_size, max_bytes, self._prefetch_stop),
+            name="render-prefetch", daemon=True)
+        self._prefetch_thread.start()
+    
+    def _prefetch_worker(self, floors: List[Tuple[str, PDFParser]], scale: float,
+                         target_size: Optional[Tuple[int, int]], max_bytes: int,
+                         stop: threading.Event):
+        rendered = 0
+        for floor_name, parser in floors:
+            while self._foreground_waiting and not stop.is_set():
+                stop.wait(PREFETCH_YIELD_SECONDS)
+            if stop.is_set():
+                return
+            if self.render_cache.total_bytes >= max_bytes:
+                print(f"Prefetch stopped at {floor_name}: render cache holds {self.render_cache.total_bytes} bytes")
+                break
+            
+            key = (parser.pdf_path, parser.page_number, scale, target_size)
+            with self._pdf_lock:
+                if stop.is_set():
+                    return
+                if key not in self.render_cache:
+                    try:
+                        self._render_floor(parser, key, scale, target_size)
+                        rendered += 1
+                    except Exception as e:
+                        print(f"Prefetch of {floor_name} failed: {e}")
+        print(f"Prefetched {rendered} floor renders")
+    
+    def stop_prefetch(self):
+        """Stop background prefetching and wait for the current render"""
+        self._prefetch_stop.set()
+        if self._prefetch_thread is not None:
+            self._prefetch_thread.join()
+            self._prefetch_thread = None
     
     def close_all(self):
         """Close all PDF documents"""
+        self.stop_prefetch()
         for parser in self.floors.values():
             parser.close()
+        if self.document_pool is not None:
+            print(f"Document pool: {self.document_pool.stats()}")
+            self.document_pool.close_all()
+        if self.render_cache is not None:
+            print(f"Render cache: {self.render_cache.stats()}")
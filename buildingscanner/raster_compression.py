@@ -0,0 +1,114 @@
+"""Content-aware compression of the floor PNGs.
+
+Floor renders are flat-coloured line art whose thousands of distinct
+colours are almost all anti-aliasing. Each image is analysed first:
+
+- near-grey images are stored as grey levels;
+- otherwise the palette gets the fewest colours (a power of two) that
+  cover `coverage` of the pixels, clamped to [MIN_COLORS, max_colors].
+
+The image is quantized to that palette (dithering optional) and saved as an
+optimized palette PNG. If the file is still over the byte budget, the image
+is scaled down and re-encoded, but never below min_scale of its original
+size, so room numbers stay legible.
+"""
+
+from __future__ import annotations
+
+import io
+import math
+from typing import Any, Dict, Optional, Tuple
+
+DEFAULT_BYTE_BUDGET = 64 * 1024
+DEFAULT_MAX_COLORS = 64
+DEFAULT_COVERAGE = 0.98
+DEFAULT_MIN_SCALE = 0.6
+MIN_COLORS = 8
+
+# Max saturation (0-255) for an image to count as greyscale
+GRAYSCALE_MAX_SATURATION = 24
+# Budget retries; each one aims a little below the budget
+MAX_BUDGET_ATTEMPTS = 4
+
+
+def analyze_colors(image, coverage: float = DEFAULT_COVERAGE,
+                   max_colors: int = DEFAULT_MAX_COLORS) -> Dict[str, Any]:
+    """Distinct and dominant colour counts, and whether the image is greyscale"""
+    rgb = image.convert("RGB")
+    width, height = rgb.size
+    counts = sorted((count for count, _ in rgb.getcolors(width * height)), reverse=True)
+
+    covered = 0
+    dominant = 0
+    for count in counts:
+        covered += count
+        dominant += 1
+        if covered >= coverage * width * height:
+            break
+
+    palette_colors = 2 ** math.ceil(math.log2(max(dominant, 2)))
+    _, max_saturation = rgb.convert("HSV").getchannel("S").getextrema()
+    return {
+        "colors": len(counts),
+        "dominantColors": dominant,
+        "paletteColors": min(max(palette_colors, MIN_COLORS), max_colors),
+        "grayscale": max_saturation <= GRAYSCALE_MAX_SATURATION,
+    }
+
+
+def quantize(image, colors: int, grayscale: bool, dither: bool):
+    """Palette image with at most `colors` entries"""
+    from PIL import Image
+
+    if grayscale:
+        source = image.convert("L")
+        quantized = source.quantize(colors=colors, dither=Image.Dither.NONE)
+    else:
+        source = image.convert("RGB")
+        quantized = source.quantize(colors=colors, method=Image.Quantize.FASTOCTREE,
+                                    dither=Image.Dither.NONE)
+    if dither:
+        # Pillow only dithers when mapping onto an existing palette
+        quantized = source.quantize(palette=quantized, dither=Image.Dither.FLOYDSTEINBERG)
+    return quantized
+
+
+def _png_bytes(image, **options) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG", **options)
+    return buffer.getvalue()
+
+
+def encode_floor_image(image, byte_budget: Optional[int] = DEFAULT_BYTE_BUDGET,
+                       max_colors: int = DEFAULT_MAX_COLORS, dither: bool = False,
+                       min_scale: float = DEFAULT_MIN_SCALE,
+                       coverage: float = DEFAULT_COVERAGE) -> Tuple[bytes, Dict[str, Any]]:
+    """Quantized PNG bytes of one floor image, and its report row"""
+    from PIL import Image
+
+    analysis = analyze_colors(image, coverage, max_colors)
+    # What a plain image.save() of the full-colour render would have written
+    baseline_bytes = len(_png_bytes(image))
+
+    scale = 1.0
+    for _ in range(MAX_BUDGET_ATTEMPTS):
+        scaled = image
+        if scale < 1.0:
+            size = (max(1, round(image.size[0] * scale)), max(1, round(image.size[1] * scale)))
+            scaled = image.resize(size, Image.Resampling.LANCZOS)
+        data = _png_bytes(quantize(scaled, analysis["paletteColors"], analysis["grayscale"], dither),
+                          optimize=True)
+        if byte_budget is None or len(data) <= byte_budget or scale <= min_scale:
+            break
+        # PNG size grows roughly with the pixel count
+        scale = max(min_scale, scale * math.sqrt(byte_budget / len(data)) * 0.95)
+
+    return data, {
+        **analysis,
+        "width": scaled.size[0],
+        "height": scaled.size[1],
+        "scale": round(scale, 3),
+        "baselineBytes": baseline_bytes,
+        "bytes": len(data),
+        "withinBudget": byte_budget is None or len(data) <= byte_budget,
+    }
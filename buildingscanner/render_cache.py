@@ -0,0 +1,88 @@
+"""
+In-memory LRU cache of rendered floor bitmaps
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable
+
+DEFAULT_MAX_BYTES = 128 * 1024 * 1024  # 128 MB of decoded pixels
+
+
+def image_nbytes(image) -> int:
+    """Approximate memory used by a PIL image's pixel data"""
+    width, height = image.size
+    return width * height * len(image.getbands())
+
+
+class RenderCache:
+    """Memory-bounded LRU cache of PIL images
+
+    Sizes are counted from the decoded pixel data, and the least recently
+    used images are dropped once the total exceeds max_bytes. Cached images
+    are shared: callers that draw on them must work on a copy().
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._images = OrderedDict()  # key -> (image, nbytes), oldest first
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._images
+
+    def get(self, key: Hashable):
+        """Cached image for key, or None"""
+        with self._lock:
+            entry = self._images.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._images.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def peek(self, key: Hashable):
+        """Cached image for key, or None, without counting a hit or miss"""
+        with self._lock:
+            entry = self._images.get(key)
+            return None if entry is None else entry[0]
+
+    def put(self, key: Hashable, image):
+        """Cache an image, evicting old ones to stay within max_bytes"""
+        nbytes = image_nbytes(image)
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._images.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old[1]
+            self._images[key] = (image, nbytes)
+            self.total_bytes += nbytes
+            while self.total_bytes > self.max_bytes:
+                _, (_, evicted_bytes) = self._images.popitem(last=False)
+                self.total_bytes -= evicted_bytes
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every cached image"""
+        with self._lock:
+            self._images.clear()
+            self.total_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters and current memory use"""
+        with self._lock:
+            return {
+                'images': len(self._images),
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
@@ -17,7 +17,7 @@ def check_python_version():
 
 def install_dependencies():
     """Install required Python packages"""
-    packages = ['PyMuPDF', 'Pillow']
+    packages = ['PyMuPDF', 'Pillow', 'numpy']
     
     print("📦 Installing Python dependencies...")
     
@@ -0,0 +1,118 @@
+"""Sharded buildings data: a small index plus one file per building or floor.
+
+    <out_dir>/index.json
+    <out_dir>/<building>.json            (shard_by="building")
+    <out_dir>/<building>/<floor>.json    (shard_by="floor")
+
+The index lists every building and floor with the SHA-256 of its JSON, so
+a client fetches the index, then only the shards it needs, and refetches a
+shard only when its hash changed. Shards are payloads of the same form as
+buildings.json (full or compact) holding one building, or one building
+with one floor, so compact_payload.expand_payload reads them as they are.
+The index repeats the compact header (format, version, coordScale) for
+clients that fetch a building subtree from Firebase instead of a shard
+file. ShardWriter writes each building's shards as soon as it is
+exported.
+"""
+
+import hashlib
+import json
+import os
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from compact_payload import encode_payload
+
+INDEX_FORMAT = "sharded"
+INDEX_VERSION = 1
+INDEX_FILE = "index.json"
+SHARD_MODES = ("building", "floor")
+
+# Top-level keys of a compact payload that every shard and the index carry
+_HEADER_KEYS = ("format", "version", "coordScale")
+
+
+def _header(payload: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: payload[key] for key in _HEADER_KEYS if key in payload}
+
+
+def _entry(shard: Dict[str, Any]) -> Dict[str, Any]:
+    encoded = encode_payload(shard)
+    return {"sha256": hashlib.sha256(encoded).hexdigest(), "bytes": len(encoded)}
+
+
+def _building_shards(header: Dict[str, Any], building_slug: str, building: Dict[str, Any], shard_by: str
+                     ) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+    """(index entry, {relative shard path: shard payload}) for one building"""
+    shards: Dict[str, Dict[str, Any]] = {}
+    building_shard = {**header, "buildings": {building_slug: building}}
+    building_entry = {"originalName": building["originalName"], **_entry(building_shard), "floors": {}}
+    if shard_by == "building":
+        building_entry["shard"] = f"{building_slug}.json"
+        shards[building_entry["shard"]] = building_shard
+
+    for floor_slug, floor in building["floors"].items():
+        floor_shard = {**header, "buildings": {building_slug: {**building, "floors": {floor_slug: floor}}}}
+        floor_entry = {"originalName": floor["originalName"], **_entry(floor_shard)}
+        if shard_by == "floor":
+            floor_entry["shard"] = f"{building_slug}/{floor_slug}.json"
+            shards[floor_entry["shard"]] = floor_shard
+        building_entry["floors"][floor_slug] = floor_entry
+
+    return building_entry, shards
+
+
+def _new_index(header: Dict[str, Any], shard_by: str) -> Dict[str, Any]:
+    return {"format": INDEX_FORMAT, "version": INDEX_VERSION, "shardBy": shard_by,
+            "payload": header, "buildings": {}}
+
+
+class ShardWriter:
+    """Writes shards as each building is exported, and the index at the end
+
+    Only the index, which is a few hundred bytes per building, stays in
+    memory. write(data, path) does the actual writes.
+    """
+
+    def __init__(self, out_dir: str, write: Callable[[bytes, str], Any],
+                 header: Optional[Dict[str, Any]] = None, shard_by: str = "building"):
+        if shard_by not in SHARD_MODES:
+            raise ValueError(f"Unknown shard mode: {shard_by}")
+        self.out_dir = out_dir
+        self.write = write
+        self.header = _header(header or {})
+        self.shard_by = shard_by
+        self.index = _new_index(self.header, shard_by)
+        self._written: set = set()
+
+    def add(self, building_slug: str, building: Dict[str, Any]):
+        """Write one building's shards"""
+        entry, shards = _building_shards(self.header, building_slug, building, self.shard_by)
+        for relative_path, shard in shards.items():
+            self.write(encode_payload(shard), os.path.join(self.out_dir, relative_path))
+        self._written.update(shards)
+        self.index["buildings"][building_slug] = entry
+
+    def close(self) -> Dict[str, Any]:
+        """Write the index and remove stale shards; returns the index"""
+        # Clients fetch the index first, so it is always written without whitespace
+        self.write(json.dumps(self.index, separators=(",", ":"), ensure_ascii=False).encode("utf-8"),
+                   os.path.join(self.out_dir, INDEX_FILE))
+
+        for stale in _stale_shards(self.out_dir, self._written):
+            os.remove(os.path.join(self.out_dir, stale))
+            print(f"Removed stale shard {stale}")
+        # Floor directories emptied by switching to shard_by="building"
+        for dirpath, dirnames, filenames in os.walk(self.out_dir, topdown=False):
+            if dirpath != self.out_dir and not dirnames and not filenames:
+                os.rmdir(dirpath)
+        return self.index
+
+
+def _stale_shards(out_dir: str, current: set) -> List[str]:
+    stale = []
+    for dirpath, _, filenames in os.walk(out_dir):
+        for filename in filenames:
+            relative_path = os.path.relpath(os.path.join(dirpath, filename), out_dir).replace(os.sep, "/")
+            if filename.endswith(".json") and relative_path != INDEX_FILE and relative_path not in current:
+                stale.append(relative_path)
+    return stale
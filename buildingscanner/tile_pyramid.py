@@ -0,0 +1,149 @@
+"""Deep-zoom tile pyramids for floor plans.
+
+Each floor is rendered into fixed-size PNG tiles at several zoom levels,
+plus a small manifest, so a client can fetch only the tiles it shows:
+
+    <out_dir>/manifest.json
+    <out_dir>/<level>/<column>_<row>.png
+
+Level 0 fits the whole page into a single tile; every following level
+doubles the resolution until the longer side reaches max_dimension pixels.
+Tiles are clipped renders of the page's display list, which is built once
+per process, so the page content is only interpreted once rather than per
+tile. Rows of tiles run in a process pool when an executor is given
+(PyMuPDF is not thread-safe); workers return the PNG bytes and every file
+is written by the calling process, through write(data, path) if given.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import fitz  # PyMuPDF
+
+DEFAULT_TILE_SIZE = 256
+DEFAULT_MAX_DIMENSION = 8192
+
+# (pdf_path, page_number) -> (document, page rect, display list) for this
+# process's tile renders. Only the most recent page is kept.
+_display_lists: Dict[Tuple[str, int], Tuple[Any, Any, Any]] = {}
+
+
+def pyramid_levels(page_width: float, page_height: float, tile_size: int = DEFAULT_TILE_SIZE,
+                   max_dimension: int = DEFAULT_MAX_DIMENSION) -> List[Dict[str, Any]]:
+    """Describe every zoom level: scale, pixel size and tile grid"""
+    longest = max(page_width, page_height)
+    base_scale = tile_size / longest
+
+    # Levels 0..top, where the top level is the first one reaching max_dimension
+    top = 0
+    while tile_size * 2 ** top < max_dimension:
+        top += 1
+
+    levels = []
+    for level in range(top + 1):
+        scale = base_scale * (2 ** level)
+        width = math.ceil(page_width * scale)
+        height = math.ceil(page_height * scale)
+        levels.append({
+            "level": level,
+            "scale": scale,
+            "width": width,
+            "height": height,
+            "columns": math.ceil(width / tile_size),
+            "rows": math.ceil(height / tile_size),
+        })
+    return levels
+
+
+def render_tile_row(pdf_path: str, page_number: int, scale: float, row: int, columns: int,
+                    tile_size: int, level_dir: str) -> List[Tuple[str, bytes]]:
+    """Render one row of tiles of a level; returns (path, PNG bytes) per tile
+
+    Module-level so it can run in a process pool worker. Each worker keeps
+    the current page's display list across calls.
+    """
+    key = (pdf_path, page_number)
+    if key not in _display_lists:
+        close_tile_documents()
+        doc = fitz.open(pdf_path)
+        page = doc[page_number]
+        _display_lists[key] = (doc, page.rect, page.get_displaylist())
+    _, page_rect, display_list = _display_lists[key]
+    matrix = fitz.Matrix(scale, scale)
+
+    # Tile edges in page coordinates
+    step = tile_size / scale
+    y0 = page_rect.y0 + row * step
+    y1 = min(y0 + step, page_rect.y1)
+
+    tiles = []
+    for column in range(columns):
+        x0 = page_rect.x0 + column * step
+        x1 = min(x0 + step, page_rect.x1)
+        pix = display_list.get_pixmap(matrix=matrix, clip=fitz.Rect(x0, y0, x1, y1))
+        tiles.append((os.path.join(level_dir, f"{column}_{row}.png"), pix.tobytes("png")))
+    return tiles
+
+
+def _write_file(data: bytes, path: str) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def close_tile_documents() -> None:
+    """Close the document kept open by render_tile_row in this process"""
+    for doc, _, _ in _display_lists.values():
+        doc.close()
+    _display_lists.clear()
+
+
+def export_tile_pyramid(pdf_path: str, out_dir: str, page_number: int = 0,
+                        tile_size: int = DEFAULT_TILE_SIZE,
+                        max_dimension: int = DEFAULT_MAX_DIMENSION,
+                        executor: Optional[Executor] = None,
+                        write: Optional[Callable[[bytes, str], Any]] = None) -> Dict[str, Any]:
+    """Render all tiles of one floor into out_dir and write its manifest"""
+    write = write or _write_file
+    with fitz.open(pdf_path) as doc:
+        page_rect = doc[page_number].rect
+        page_width, page_height = page_rect.width, page_rect.height
+
+    levels = pyramid_levels(page_width, page_height, tile_size, max_dimension)
+
+    jobs: List[Tuple[Any, ...]] = []
+    for level in levels:
+        level_dir = os.path.join(out_dir, str(level["level"]))
+        for row in range(level["rows"]):
+            jobs.append((pdf_path, page_number, level["scale"], row, level["columns"],
+                         tile_size, level_dir))
+
+    tile_count = 0
+    if executor is not None:
+        rows = (future.result() for future in [executor.submit(render_tile_row, *job) for job in jobs])
+    else:
+        rows = (render_tile_row(*job) for job in jobs)
+    for tiles in rows:
+        for path, data in tiles:
+            write(data, path)
+        tile_count += len(tiles)
+    if executor is None:
+        close_tile_documents()
+
+    manifest = {
+        "version": 1,
+        "tileSize": tile_size,
+        "format": "png",
+        "pageWidth": page_width,
+        "pageHeight": page_height,
+        "levels": levels,
+    }
+    write(json.dumps(manifest, indent=2).encode("utf-8"), os.path.join(out_dir, "manifest.json"))
+
+    print(f"  -> {tile_count} tiles in {len(levels)} levels")
+    return manifest
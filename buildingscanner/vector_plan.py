@@ -0,0 +1,297 @@
+"""Vector floor plans (SVG) built from the PDF's own drawings.
+
+The paths from PDFParser.extract_drawings are simplified with
+Ramer-Douglas-Peucker and snapped to an integer grid whose longer side is
+`grid` units, which is also the SVG viewBox:
+
+    <out_dir>/<floor>.svg
+
+All paths with the same style share one <path> element, with duplicate
+polylines dropped and the rest chained end to end in spatial order. Every
+coordinate is relative to the previous point, so most numbers are one or
+two digits. The app draws its own room labels, so text is left out unless
+labels are asked for, and then only the spans classified as room or
+entrance labels are added as <text> elements. Raster images embedded in
+the PDF are left out.
+
+Plans with a lot of hatching can still be larger than the PNG of the same
+floor; export_vector_plan skips those when given the PNG's size.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from xml.sax.saxutils import escape
+
+# One grid unit is about 1.5 pixels of the 2x floor PNG of an A4 or Letter page
+DEFAULT_GRID = 1024
+DEFAULT_TOLERANCE = 1.0  # grid units
+
+# Height in grid units of the rows that polylines are ordered by
+ORDER_BAND = 32
+
+# Strokes thinner than this many grid units become 1px non-scaling hairlines,
+# like a zero-width PDF stroke
+HAIRLINE_WIDTH = 1.0
+
+Point = Tuple[float, float]
+
+
+def simplify_polyline(points: Sequence[Point], tolerance: float) -> List[Point]:
+    """Ramer-Douglas-Peucker simplification, keeping both end points"""
+    if len(points) < 3:
+        return list(points)
+
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    tolerance_sq = tolerance * tolerance
+
+    while stack:
+        first, last = stack.pop()
+        (x0, y0), (x1, y1) = points[first], points[last]
+        dx, dy = x1 - x0, y1 - y0
+        length_sq = dx * dx + dy * dy
+
+        farthest, farthest_sq = first, -1.0
+        for index in range(first + 1, last):
+            px, py = points[index]
+            if length_sq == 0:
+                distance_sq = (px - x0) ** 2 + (py - y0) ** 2
+            else:
+                cross = dx * (py - y0) - dy * (px - x0)
+                distance_sq = cross * cross / length_sq
+            if distance_sq > farthest_sq:
+                farthest, farthest_sq = index, distance_sq
+
+        if farthest_sq > tolerance_sq:
+            keep[farthest] = True
+            stack.append((first, farthest))
+            stack.append((farthest, last))
+
+    return [point for point, kept in zip(points, keep) if kept]
+
+
+def quantize_polyline(points: Sequence[Point], scale: float) -> List[Tuple[int, int]]:
+    """Points snapped to the integer grid, without consecutive duplicates"""
+    snapped: List[Tuple[int, int]] = []
+    for x, y in points:
+        point = (round(x * scale), round(y * scale))
+        if not snapped or snapped[-1] != point:
+            snapped.append(point)
+    return snapped
+
+
+def _numbers(values: Sequence[int]) -> str:
+    """Space-separated numbers, letting minus signs double as separators"""
+    parts = []
+    for index, value in enumerate(values):
+        if index and value >= 0:
+            parts.append(" ")
+        parts.append(str(value))
+    return "".join(parts)
+
+
+def _path_data(polylines: Sequence[Tuple[List[Tuple[int, int]], bool]]) -> str:
+    """Path data with only relative moves and lines
+
+    A polyline that starts where the previous open one ended continues its
+    line run without a move. Coordinates following a move are implicit
+    relative lines, so no "l" commands are written at all.
+    """
+    runs: List[Tuple[str, List[int]]] = []
+    x = y = 0  # a leading relative move is taken as absolute
+    joinable = False
+    for points, closed in polylines:
+        if joinable and points[0] == (x, y):
+            numbers = runs[-1][1]
+        else:
+            numbers = [points[0][0] - x, points[0][1] - y]
+            runs.append(("m", numbers))
+            x, y = points[0]
+        for px, py in points[1:]:
+            numbers.extend((px - x, py - y))
+            x, y = px, py
+        if closed:
+            runs.append(("z", []))
+            # closepath returns to the start of the subpath
+            x, y = points[0]
+        joinable = not closed
+    return "".join(command + _numbers(numbers) for command, numbers in runs)
+
+
+def order_polylines(polylines: List[Tuple[List[Tuple[int, int]], bool]]
+                    ) -> List[Tuple[List[Tuple[int, int]], bool]]:
+    """Polylines chained end to end where possible, otherwise in spatial order
+
+    Rows of ORDER_BAND grid units are walked alternately left to right and
+    right to left, so the relative move to the next polyline stays short.
+    An open polyline that ends where the previous one ended is reversed so
+    the two join.
+    """
+    def position(index: int) -> Tuple[int, int]:
+        x, y = polylines[index][0][0]
+        band = y // ORDER_BAND
+        return band, x if band % 2 == 0 else -x
+
+    spatial = sorted(range(len(polylines)), key=position)
+    by_end_point: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+    for index, (points, closed) in enumerate(polylines):
+        if not closed:
+            by_end_point[points[0]].append(index)
+            by_end_point[points[-1]].append(index)
+
+    used = [False] * len(polylines)
+    ordered = []
+    next_spatial = 0
+    end = None
+    while True:
+        chosen = None
+        if end is not None:
+            chosen = next((index for index in by_end_point.get(end, ()) if not used[index]), None)
+        if chosen is None:
+            while next_spatial < len(spatial) and used[spatial[next_spatial]]:
+                next_spatial += 1
+            if next_spatial == len(spatial):
+                return ordered
+            chosen = spatial[next_spatial]
+        used[chosen] = True
+
+        points, closed = polylines[chosen]
+        if not closed and points[0] != end and points[-1] == end:
+            points = points[::-1]
+        ordered.append((points, closed))
+        end = None if closed else points[-1]
+
+
+def _color(rgb: Optional[Sequence[float]]) -> str:
+    if rgb is None:
+        return "none"
+    r, g, b = (min(255, max(0, round(channel * 255))) for channel in rgb[:3])
+    if r % 17 == 0 and g % 17 == 0 and b % 17 == 0:
+        return f"#{r // 17:x}{g // 17:x}{b // 17:x}"
+    return f"#{r:02x}{g:02x}{b:02x}"
+
+
+def _style_attrs(path: Dict[str, Any], scale: float) -> str:
+    attrs = [f'fill="{_color(path["fill"])}"']
+    if path["fill"] is not None:
+        if path["even_odd"]:
+            attrs.append('fill-rule="evenodd"')
+        if path["fill_opacity"] is not None and path["fill_opacity"] < 1:
+            attrs.append(f'fill-opacity="{path["fill_opacity"]:.2f}"')
+    if path["stroke"] is not None:
+        attrs.append(f'stroke="{_color(path["stroke"])}"')
+        width = (path["width"] or 0) * scale
+        if width < HAIRLINE_WIDTH:
+            attrs.append('stroke-width="1" vector-effect="non-scaling-stroke"')
+        else:
+            attrs.append(f'stroke-width="{width:.3g}"')
+        if path["stroke_opacity"] is not None and path["stroke_opacity"] < 1:
+            attrs.append(f'stroke-opacity="{path["stroke_opacity"]:.2f}"')
+    return " ".join(attrs)
+
+
+def _text_element(run: Dict[str, Any], scale: float) -> str:
+    x, y = (round(value * scale) for value in run["origin"])
+    color = run["color"]
+    fill = _color(((color >> 16 & 255) / 255, (color >> 8 & 255) / 255, (color & 255) / 255))
+    attrs = f'x="{x}" y="{y}" font-size="{run["size"] * scale:.3g}"'
+    if fill != "#000":
+        attrs += f' fill="{fill}"'
+    cos, sin = run["dir"]
+    if abs(sin) > 1e-3:
+        # dir is the baseline direction in page space, where y points down
+        angle = math.degrees(math.atan2(sin, cos))
+        attrs += f' transform="rotate({angle:.3g} {x} {y})"'
+    return f"<text {attrs}>{escape(run['text'])}</text>"
+
+
+def build_svg(paths: List[Dict[str, Any]], text_runs: List[Dict[str, Any]],
+              page_width: float, page_height: float, grid: int = DEFAULT_GRID,
+              tolerance: float = DEFAULT_TOLERANCE) -> Tuple[str, Dict[str, int]]:
+    """SVG document for one page, plus point counts before/after simplification"""
+    scale = grid / max(page_width, page_height)
+    stats = {"paths": 0, "points_in": 0, "points_out": 0, "texts": len(text_runs)}
+
+    # style -> distinct polylines (as dict keys, in drawing order); styles in
+    # the order they are first painted
+    groups: Dict[str, Dict[Tuple[Tuple[Tuple[int, int], ...], bool], None]] = {}
+    for path in paths:
+        style = _style_attrs(path, scale)
+        for points, closed in path["polylines"]:
+            stats["points_in"] += len(points)
+            if closed:
+                points = points + [points[0]]
+            # Tolerance is in grid units; simplify in page units
+            snapped = quantize_polyline(simplify_polyline(points, tolerance / scale), scale)
+            if closed and len(snapped) > 1 and snapped[-1] == snapped[0]:
+                snapped.pop()
+            if len(snapped) < 2:
+                continue
+            groups.setdefault(style, {})[(tuple(snapped), closed)] = None
+
+    width, height = round(page_width * scale), round(page_height * scale)
+    lines = [f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {width} {height}" '
+             f'stroke-linejoin="round">']
+    for style, distinct in groups.items():
+        polylines = order_polylines([(list(points), closed) for points, closed in distinct])
+        stats["paths"] += 1
+        stats["points_out"] += sum(len(points) for points, _ in polylines)
+        lines.append(f'<path {style} d="{_path_data(polylines)}"/>')
+    if text_runs:
+        lines.append('<g font-family="sans-serif">')
+        lines.extend(_text_element(run, scale) for run in text_runs)
+        lines.append("</g>")
+    lines.append("</svg>\n")
+    return "\n".join(lines), stats
+
+
+def label_runs(parser) -> List[Dict[str, Any]]:
+    """Text runs of a floor that are room or entrance labels"""
+    runs = []
+    for run in parser.extract_text_runs():
+        runs.append({**run, "text": run["text"].strip()})
+    labels = parser.classify_spans([(run["text"], run["size"], None) for run in runs])
+    return [run for run, label in zip(runs, labels) if label is not None]
+
+
+def _write_file(data: bytes, path: str) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def export_vector_plan(parser, out_path: str, grid: int = DEFAULT_GRID,
+                       tolerance: float = DEFAULT_TOLERANCE, labels: bool = False,
+                       max_bytes: Optional[int] = None,
+                       write: Optional[Callable[[bytes, str], Any]] = None) -> Dict[str, Any]:
+    """Write one floor's drawings as an SVG file, through write(data, path) if given; returns its stats
+
+    With max_bytes (the size of the floor's PNG), an SVG that isn't smaller
+    is not written, and stats["written"] is False.
+    """
+    page_width, page_height = parser.get_pdf_dimensions()
+    paths = parser.extract_drawings()
+    text_runs = label_runs(parser) if labels else []
+
+    svg, stats = build_svg(paths, text_runs, page_width, page_height, grid, tolerance)
+    data = svg.encode("utf-8")
+    stats["bytes"] = len(data)
+    stats["written"] = max_bytes is None or len(data) < max_bytes
+    summary = (f"{stats['paths']} paths, {stats['points_in']} -> {stats['points_out']} points, "
+               f"{stats['bytes'] / 1024:.0f} KiB")
+    if max_bytes is not None:
+        stats["pngBytes"] = max_bytes
+        summary += f" vs {max_bytes / 1024:.0f} KiB PNG"
+    if not stats["written"]:
+        print(f"  ! Skipping vector plan: {summary}")
+        return stats
+
+    write = write or _write_file
+    write(data, out_path)
+    print(f"  -> {summary}")
+    return stats
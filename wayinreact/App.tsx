@@ -3,7 +3,7 @@
  * Hovedkomponent der håndterer app navigation, søgning og kalender integration
  */
 
-import React, { useCallback, useMemo, useState } from 'react';
+import React, { useCallback, useMemo, useRef, useState } from 'react';
 import {
   KeyboardAvoidingView,
   Platform,
@@ -33,12 +33,13 @@ import { SettingsPanel } from './src/components/SettingsPanel';
 import { useRemoteBuildings } from './src/hooks/useRemoteBuildings';
 import { useCalendarPermissions } from './src/hooks/useCalendarPermissions';
 import { listRoomIds, searchRoomInBuilding } from './src/utils/search';
-import { extractRoomFromText, isGroundFloor } from './src/utils/buildingSearch';
+import { findRoomInBuildings, isGroundFloor } from './src/utils/buildingSearch';
 import { appStyles } from './src/styles/AppStyles';
 
 const App: React.FC = () => {
   // UI State - håndterer app navigation og visninger
   const [selectedBuildingKey, setSelectedBuildingKey] = useState<string | null>(null); // Valgt bygning
+  const [selectedBuilding, setSelectedBuilding] = useState<BuildingData | null>(null); // Den valgte bygnings data
   const [searchQuery, setSearchQuery] = useState(''); // Søgefelt input
   const [displayedFloor, setDisplayedFloor] = useState<DisplayedFloor | null>(null); // Viser nuværende etage
   const [errorMessage, setErrorMessage] = useState<string | null>(null); // Fejlbesked til bruger
@@ -57,7 +58,7 @@ const App: React.FC = () => {
   );
 
   // Hooks - henter data og håndterer permissions
-  const { payload, loading, error } = useRemoteBuildings(); // Henter bygningsdata fra Firebase
+  const { buildings, loading, error, loadBuilding } = useRemoteBuildings(); // Henter bygningslisten fra Firebase
   const {
     calendarPermissionStatus,
     calendarLookupError,
@@ -92,21 +93,18 @@ const App: React.FC = () => {
     return `${formatted}${locationPart}`;
   }, [calendarLastEvent]);
 
-  /** Konverterer bygningsdata til liste format */
+  /** Konverterer bygningslisten til liste format */
   const buildingEntries = useMemo<BuildingEntry[]>(() => {
-    return Object.entries(payload.buildings).map(([key, value]) => ({
+    return buildings.map(({ key, originalName }) => ({
       key,
-      data: value as BuildingData,
-      name: (value as BuildingData).originalName
+      name: originalName
         .replace(/_/g, ' ')
         .replace(/\b\w/g, (match) => match.toUpperCase()),
     }));
-  }, [payload]);
+  }, [buildings]);
 
-  /** Finder den valgte bygning fra nøgle */
-  const selectedBuilding: BuildingData | null = selectedBuildingKey
-    ? (payload.buildings[selectedBuildingKey] as BuildingData)
-    : null;
+  /** Tæller for bygningsvalg og søgninger; kun det seneste svar vises */
+  const latestRequest = useRef(0);
 
   /** Henter lokaleforslag til visning (maks 20) */
   const roomSuggestions = useMemo(() => {
@@ -121,11 +119,13 @@ const App: React.FC = () => {
   /**
    * Anvender søgeresultat - opdaterer UI til at vise fundet lokale
    * @param buildingKey - Bygningsnøgle
+   * @param building - Bygningens data
    * @param result - Søgeresultat med etage og lokale info
    */
   const applySearchResult = useCallback(
-    (buildingKey: string, result: SearchResult) => {
+    (buildingKey: string, building: BuildingData, result: SearchResult) => {
       setSelectedBuildingKey(buildingKey);
+      setSelectedBuilding(building);
       setSearchQuery(result.room.id);
       setQuickLookupError(null);
       setDisplayedFloor({
@@ -144,21 +144,25 @@ const App: React.FC = () => {
    * Håndterer hurtig søgning fra tekstinput
    * Ekstraherer lokalenummer fra tekst og finder lokale
    */
-  const handleQuickLookup = useCallback(() => {
+  const handleQuickLookup = useCallback(async () => {
     if (!quickLookupValue.trim()) {
       setQuickLookupError('Indsæt et lokalenummer');
       return;
     }
 
-    const match = extractRoomFromText(quickLookupValue, payload.buildings);
+    const request = ++latestRequest.current;
+    const match = await findRoomInBuildings(quickLookupValue, buildings, loadBuilding);
+    if (request !== latestRequest.current) {
+      return;
+    }
     if (!match) {
       setQuickLookupError('Kunne ikke finde lokalet. Tjek at nummeret er korrekt.');
       return;
     }
 
     setQuickLookupError(null);
-    applySearchResult(match.buildingKey, match.result);
-  }, [applySearchResult, quickLookupValue, payload.buildings]);
+    applySearchResult(match.buildingKey, match.building, match.result);
+  }, [applySearchResult, quickLookupValue, buildings, loadBuilding]);
 
   /**
    * Henter næste kalenderaftale og finder lokale info
@@ -228,10 +232,15 @@ const App: React.FC = () => {
         (value): value is string => !!value && value.trim().length > 0,
       );
 
+      const request = ++latestRequest.current;
       for (const text of candidateTexts) {
-        const match = extractRoomFromText(text, payload.buildings);
+        const match = await findRoomInBuildings(text, buildings, loadBuilding);
+        if (request !== latestRequest.current) {
+          setCalendarLookupMessage(null);
+          return;
+        }
         if (match) {
-          applySearchResult(match.buildingKey, match.result);
+          applySearchResult(match.buildingKey, match.building, match.result);
           const formattedTime = eventStartDate.toLocaleString('da-DK', {
             weekday: 'short',
             hour: '2-digit',
@@ -261,7 +270,7 @@ const App: React.FC = () => {
     } finally {
       setCalendarLookupLoading(false);
     }
-  }, [applySearchResult, ensureCalendarAccess, payload.buildings, setCalendarLookupError]);
+  }, [applySearchResult, ensureCalendarAccess, buildings, loadBuilding, setCalendarLookupError]);
 
   /**
    * Aktiverer/deaktiverer kalender sync
@@ -286,21 +295,26 @@ const App: React.FC = () => {
   );
 
   /**
-   * Vælger en bygning og viser stueetagen
+   * Henter en bygning og viser stueetagen
    * @param key - Bygningsnøgle
    */
   const handleSelectBuilding = useCallback(
-    (key: string) => {
-      setSelectedBuildingKey(key);
+    async (key: string) => {
       setSearchQuery('');
       setErrorMessage(null);
       setQuickLookupError(null);
 
-      const building = payload.buildings[key] as BuildingData | undefined;
+      const request = ++latestRequest.current;
+      const building = await loadBuilding(key);
+      if (request !== latestRequest.current) {
+        return;
+      }
       if (!building) {
-        setDisplayedFloor(null);
+        setQuickLookupError('Kunne ikke hente bygningen. Prøv igen.');
         return;
       }
+      setSelectedBuildingKey(key);
+      setSelectedBuilding(building);
 
       const entries = Object.entries(building.floors);
       const defaultEntry =
@@ -317,14 +331,14 @@ const App: React.FC = () => {
         setDisplayedFloor(null);
       }
     },
-    [payload],
+    [loadBuilding],
   );
 
   /**
    * Håndterer søgning efter lokale
    * Søger i valgt bygning eller globalt hvis ingen bygning valgt
    */
-  const handleSearch = useCallback(() => {
+  const handleSearch = useCallback(async () => {
     const trimmedQuery = searchQuery.trim();
     if (!trimmedQuery) {
       return;
@@ -336,11 +350,15 @@ const App: React.FC = () => {
         setErrorMessage('Kunne ikke finde lokalet. Tjek at nummeret er korrekt.');
         return;
       }
-      applySearchResult(selectedBuildingKey, result);
+      applySearchResult(selectedBuildingKey, selectedBuilding, result);
       return;
     }
 
-    const globalMatch = extractRoomFromText(trimmedQuery, payload.buildings);
+    const request = ++latestRequest.current;
+    const globalMatch = await findRoomInBuildings(trimmedQuery, buildings, loadBuilding);
+    if (request !== latestRequest.current) {
+      return;
+    }
     if (!globalMatch) {
       setErrorMessage(
         'Kunne ikke finde lokalet. Vælg en bygning eller indsæt et gyldigt lokalenummer.',
@@ -348,8 +366,8 @@ const App: React.FC = () => {
       return;
     }
 
-    applySearchResult(globalMatch.buildingKey, globalMatch.result);
-  }, [applySearchResult, searchQuery, selectedBuilding, selectedBuildingKey, payload.buildings]);
+    applySearchResult(globalMatch.buildingKey, globalMatch.building, globalMatch.result);
+  }, [applySearchResult, searchQuery, selectedBuilding, selectedBuildingKey, buildings, loadBuilding]);
 
   /**
    * Håndterer klik på lokaleforslag
@@ -364,14 +382,16 @@ const App: React.FC = () => {
       if (!result) {
         return;
       }
-      applySearchResult(selectedBuildingKey, result);
+      applySearchResult(selectedBuildingKey, selectedBuilding, result);
     },
     [applySearchResult, selectedBuilding, selectedBuildingKey],
   );
 
   /** Går tilbage til bygningsvalg */
   const handleBack = useCallback(() => {
+    latestRequest.current += 1;
     setSelectedBuildingKey(null);
+    setSelectedBuilding(null);
     setSearchQuery('');
     setDisplayedFloor(null);
     setErrorMessage(null);
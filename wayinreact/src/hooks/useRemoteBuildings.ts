@@ -1,25 +1,19 @@
-import { useEffect, useState } from 'react';
+import { useCallback, useEffect, useState } from 'react';
 import { FIREBASE_DB_URL, FIREBASE_AUTH } from '../config';
-import type { BuildingsPayload } from '../types';
+import type { BuildingData } from '../types';
+import {
+  fetchBuildingSource,
+  loadBuilding as loadShardedBuilding,
+  type BuildingSource,
+  type BuildingSummary,
+} from '../utils/shardedBuildings';
 
-const emptyPayload: BuildingsPayload = { buildings: {} } as BuildingsPayload;
+const baseUrl = `${FIREBASE_DB_URL.replace(/\/$/, '')}/buildings`;
 
-const fetchRemoteBuildings = async (): Promise<BuildingsPayload | null> => {
+const fetchRemoteBuildings = async (): Promise<BuildingSource | null> => {
   try {
-    const url = `${FIREBASE_DB_URL.replace(/\/$/, '')}/buildings.json`;
-    const params = FIREBASE_AUTH ? `?auth=${encodeURIComponent(FIREBASE_AUTH)}` : '';
-    const resp = await fetch(url + params, { cache: 'no-store' });
-    if (!resp.ok) {
-      console.warn('Failed to fetch remote buildings:', resp.status, await resp.text());
-      return null;
-    }
-    const data = await resp.json();
-    // Basic validation: must have buildings key
-    if (!data || typeof data !== 'object' || !data.buildings) {
-      console.warn('Remote buildings payload invalid');
-      return null;
-    }
-    return data as BuildingsPayload;
+    // Med --shards hentes kun indekset; ellers den samlede payload
+    return await fetchBuildingSource(baseUrl, FIREBASE_AUTH);
   } catch (err) {
     console.warn('Error fetching remote buildings:', err);
     return null;
@@ -27,7 +21,7 @@ const fetchRemoteBuildings = async (): Promise<BuildingsPayload | null> => {
 };
 
 export const useRemoteBuildings = () => {
-  const [payload, setPayload] = useState<BuildingsPayload>(emptyPayload);
+  const [source, setSource] = useState<BuildingSource | null>(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
 
@@ -38,7 +32,7 @@ export const useRemoteBuildings = () => {
         setLoading(true);
         const remote = await fetchRemoteBuildings();
         if (remote && !cancelled) {
-          setPayload(remote);
+          setSource(remote);
           setError(null);
         } else if (!cancelled) {
           setError('Kunne ikke hente bygningsdata');
@@ -59,5 +53,22 @@ export const useRemoteBuildings = () => {
     };
   }, []);
 
-  return { payload, loading, error };
+  // Henter én bygning ved behov; null hvis den ikke findes eller ikke kunne hentes
+  const loadBuilding = useCallback(
+    async (key: string): Promise<BuildingData | null> => {
+      if (!source) {
+        return null;
+      }
+      try {
+        return await loadShardedBuilding(baseUrl, FIREBASE_AUTH, source, key);
+      } catch (err) {
+        console.warn(`Error fetching building ${key}:`, err);
+        return null;
+      }
+    },
+    [source],
+  );
+
+  const buildings: BuildingSummary[] = source?.buildings ?? [];
+  return { buildings, loading, error, loadBuilding };
 };
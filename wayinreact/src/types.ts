@@ -62,7 +62,6 @@ export interface CalendarEventSummary {
 // En bygning med nøgle og metadata
 export interface BuildingEntry {
   key: string; // Bygningsnøgle (f.eks. "solbjerg", "porcelaenshaven")
-  data: BuildingData; // Bygningsdata
   name: string; // Displaynavn
 }
 
@@ -247,6 +247,85 @@ export const extractRoomFromText = (
   return null;
 };
 
+/**
+ * Finder de bygninger en tekst nævner via bygningskode eller navn
+ * @param input - Tekst fra søgefelt eller kalenderaftale
+ * @param buildings - Bygningslisten fra indekset
+ * @returns Bygningsnøgler i listens rækkefølge
+ */
+export const buildingKeysFromText = (
+  input: string,
+  buildings: { key: string; originalName: string }[],
+): string[] => {
+  const upper = input.toUpperCase();
+  const lower = input.toLowerCase();
+  const tokens = upper.match(/[A-ZÆØÅ0-9._-]+/g) ?? [];
+  const locationMatch = input.match(/lokalitet\s*:\s*([^\n]+)/i);
+  const locationUpper = locationMatch ? locationMatch[1].toUpperCase() : '';
+
+  const hinted = new Set<string>();
+  for (const [code, buildingKey] of Object.entries(BUILDING_CODE_MAP)) {
+    if (locationUpper.includes(code) || tokens.some((token) => token.startsWith(code))) {
+      hinted.add(buildingKey);
+    }
+  }
+  return buildings
+    .filter(
+      ({ key, originalName }) =>
+        hinted.has(key) ||
+        lower.includes(key.toLowerCase()) ||
+        lower.includes(originalName.replace(/_/g, ' ').toLowerCase()),
+    )
+    .map(({ key }) => key);
+};
+
+/**
+ * Søger et lokale på tværs af bygninger, der hentes efter behov
+ * Bygninger teksten nævner hentes først; findes lokalet ikke der,
+ * hentes resten én ad gangen, indtil der er et match
+ * @param input - Tekst fra søgefelt eller kalenderaftale
+ * @param buildings - Bygningslisten fra indekset
+ * @param loadBuilding - Henter én bygnings data
+ */
+export const findRoomInBuildings = async (
+  input: string,
+  buildings: { key: string; originalName: string }[],
+  loadBuilding: (key: string) => Promise<BuildingData | null>,
+): Promise<{ buildingKey: string; building: BuildingData; result: SearchResult } | null> => {
+  if (!input.trim()) {
+    return null;
+  }
+
+  const hintedKeys = buildingKeysFromText(input, buildings);
+  const hinted: Record<string, BuildingData> = {};
+  const loaded = await Promise.all(hintedKeys.map(loadBuilding));
+  hintedKeys.forEach((key, position) => {
+    const building = loaded[position];
+    if (building) {
+      hinted[key] = building;
+    }
+  });
+  const hintedMatch = extractRoomFromText(input, hinted);
+  if (hintedMatch) {
+    return { ...hintedMatch, building: hinted[hintedMatch.buildingKey] };
+  }
+
+  for (const { key } of buildings) {
+    if (hintedKeys.includes(key)) {
+      continue;
+    }
+    const building = await loadBuilding(key);
+    if (!building) {
+      continue;
+    }
+    const match = extractRoomFromText(input, { [key]: building });
+    if (match) {
+      return { ...match, building };
+    }
+  }
+  return null;
+};
+
 export const isGroundFloor = (key: string, floor: { originalName: string }) => {
   const haystack = `${key} ${floor.originalName}`.toLowerCase();
   return (
@@ -0,0 +1,82 @@
+/**
+ * compactPayload.ts - Læser bygningsdata i kompakt kolonneformat
+ *
+ * export_building_data.py --compact skriver hver etages lokaler og indgange
+ * som parallelle arrays med heltalskoordinater (0..coordScale). Her pakkes
+ * de ud til de almindelige Room/Entrance-objekter. Det gamle format
+ * (et objekt pr. lokale) returneres uændret.
+ */
+
+import type { BuildingData, BuildingsPayload, Entrance, FloorData, Room } from '../types';
+
+export const COMPACT_FORMAT = 'compact';
+export const COMPACT_VERSION = 1;
+
+// Kolonner for én etages lokaler eller indgange
+interface CompactColumns {
+  id?: string[];
+  text?: string[];
+  x?: number[];
+  y?: number[];
+}
+
+// Kompakt payload som den hentes fra Firebase
+interface CompactPayload {
+  format: typeof COMPACT_FORMAT;
+  version: number;
+  coordScale: number;
+  buildings?: Record<string, { originalName: string; floors?: Record<string, Record<string, unknown>> }>;
+}
+
+export const isCompactPayload = (data: unknown): data is CompactPayload =>
+  !!data && typeof data === 'object' && (data as { format?: unknown }).format === COMPACT_FORMAT;
+
+// Pak kolonner ud til lokaler; tom tekst betyder samme tekst som id
+const expandRooms = (columns: CompactColumns | undefined, scale: number): Room[] => {
+  // Firebase gemmer ikke tomme arrays, så kolonner kan mangle
+  const xs = columns?.x ?? [];
+  return xs.map((x, index) => {
+    const id = columns?.id?.[index] ?? '';
+    return {
+      id,
+      text: columns?.text?.[index] || id,
+      x: x / scale,
+      y: (columns?.y?.[index] ?? 0) / scale,
+    };
+  });
+};
+
+// Pak kolonner ud til indgange
+const expandEntrances = (columns: CompactColumns | undefined, scale: number): Entrance[] => {
+  const xs = columns?.x ?? [];
+  return xs.map((x, index) => ({
+    text: columns?.text?.[index] ?? '',
+    x: x / scale,
+    y: (columns?.y?.[index] ?? 0) / scale,
+  }));
+};
+
+// Returner payload med lokaler som objekter, uanset format
+export const expandBuildingsPayload = (data: BuildingsPayload | CompactPayload): BuildingsPayload => {
+  if (!isCompactPayload(data)) {
+    return data;
+  }
+  if (data.version !== COMPACT_VERSION) {
+    throw new Error(`Ukendt version af kompakt bygningsdata: ${data.version}`);
+  }
+
+  const scale = data.coordScale;
+  const buildings: Record<string, BuildingData> = {};
+  Object.entries(data.buildings ?? {}).forEach(([buildingKey, building]) => {
+    const floors: Record<string, FloorData> = {};
+    Object.entries(building.floors ?? {}).forEach(([floorKey, floor]) => {
+      floors[floorKey] = {
+        ...(floor as unknown as FloorData),
+        rooms: expandRooms(floor.rooms as CompactColumns | undefined, scale),
+        entrances: expandEntrances(floor.entrances as CompactColumns | undefined, scale),
+      };
+    });
+    buildings[buildingKey] = { ...building, floors };
+  });
+  return { buildings };
+};
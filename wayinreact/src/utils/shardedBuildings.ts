@@ -0,0 +1,246 @@
+/**
+ * shardedBuildings.ts - Henter bygningsdata bygning for bygning
+ *
+ * export_building_data.py --shards lægger et lille indeks ved siden af
+ * bygningerne i Firebase (/buildings/index) med navn og SHA-256 pr. bygning.
+ * Ved opstart hentes kun indekset; en bygning hentes først, når den vælges
+ * eller en søgning peger på den. Hentede bygninger gemmes i hver sin fil på
+ * enheden sammen med deres hash og genbruges, så længe hashen passer. Uden
+ * indeks huskes det, så næste start henter den samlede payload direkte uden
+ * et ekstra kald.
+ */
+
+import type { BuildingData, BuildingsPayload } from '../types';
+import { expandBuildingsPayload } from './compactPayload';
+
+// Indeksets beskrivelse af én bygning
+export interface BuildingIndexEntry {
+  originalName: string;
+  sha256: string;
+  bytes: number;
+  floors?: Record<string, { originalName: string; sha256: string; bytes: number }>;
+}
+
+// Indekset som det ligger i Firebase
+export interface BuildingIndex {
+  format: 'sharded';
+  version: number;
+  payload?: { format?: string; version?: number; coordScale?: number };
+  buildings?: Record<string, BuildingIndexEntry>;
+}
+
+export const INDEX_VERSION = 1;
+
+// En bygning uden etager, som den står i bygningslisten
+export interface BuildingSummary {
+  key: string;
+  originalName: string;
+}
+
+// Det appen holder efter opstart: indekset, eller hele payloaden uden indeks
+export interface BuildingSource {
+  buildings: BuildingSummary[];
+  index: BuildingIndex | null;
+  payload: BuildingsPayload | null;
+}
+
+const CACHE_FILE_NAME = 'buildings-cache.json';
+const CACHE_VERSION = 2;
+
+// Det der gemmes på enheden mellem starter; bygningerne ligger i egne filer
+interface BuildingCache {
+  version: number;
+  sharded: boolean | null; // null: ikke set endnu
+}
+
+// Én hentet bygning på enheden
+interface CachedBuilding {
+  version: number;
+  sha256: string;
+  data: BuildingData;
+}
+
+interface CacheFile {
+  exists: boolean;
+  text(): Promise<string>;
+  write(content: string): void;
+}
+
+const emptyCache = (): BuildingCache => ({ version: CACHE_VERSION, sharded: null });
+
+// En fil i cachemappen, eller null hvor expo-file-system ikke findes (fx web)
+const cacheFile = (name: string): CacheFile | null => {
+  try {
+    const { File, Paths } = require('expo-file-system');
+    return new File(Paths.cache, name) as CacheFile;
+  } catch {
+    return null;
+  }
+};
+
+const buildingFileName = (key: string) => `building-${encodeURIComponent(key)}.json`;
+
+const readJsonFile = async <T>(name: string): Promise<T | null> => {
+  try {
+    const file = cacheFile(name);
+    if (!file || !file.exists) {
+      return null;
+    }
+    return JSON.parse(await file.text()) as T;
+  } catch (err) {
+    console.warn(`Could not read ${name}:`, err);
+    return null;
+  }
+};
+
+const writeJsonFile = (name: string, content: unknown) => {
+  try {
+    cacheFile(name)?.write(JSON.stringify(content));
+  } catch (err) {
+    console.warn(`Could not write ${name}:`, err);
+  }
+};
+
+const loadCache = async (): Promise<BuildingCache> => {
+  const cache = await readJsonFile<BuildingCache>(CACHE_FILE_NAME);
+  return cache?.version === CACHE_VERSION ? cache : emptyCache();
+};
+
+// Gem kun når noget har ændret sig, så en varm start ikke skriver
+const saveSharded = (cache: BuildingCache, sharded: boolean) => {
+  if (cache.sharded !== sharded) {
+    writeJsonFile(CACHE_FILE_NAME, { version: CACHE_VERSION, sharded });
+  }
+};
+
+const fetchJson = async (url: string, auth: string | null): Promise<unknown> => {
+  const params = auth ? `?auth=${encodeURIComponent(auth)}` : '';
+  const resp = await fetch(url + params, { cache: 'no-store' });
+  if (!resp.ok) {
+    throw new Error(`HTTP ${resp.status} for ${url}`);
+  }
+  return resp.json();
+};
+
+const isIndex = (index: unknown): index is BuildingIndex =>
+  !!index &&
+  typeof index === 'object' &&
+  (index as BuildingIndex).format === 'sharded' &&
+  (index as BuildingIndex).version === INDEX_VERSION;
+
+// Hent indekset; null hvis eksporten ikke er lavet med --shards
+export const fetchBuildingIndex = async (baseUrl: string, auth: string | null): Promise<BuildingIndex | null> => {
+  const index = await fetchJson(`${baseUrl}/index.json`, auth);
+  return isIndex(index) ? index : null;
+};
+
+// Hent én bygning og pak den ud efter indeksets format
+export const fetchBuilding = async (
+  baseUrl: string,
+  auth: string | null,
+  index: BuildingIndex,
+  key: string,
+): Promise<BuildingData | null> => {
+  const building = await fetchJson(`${baseUrl}/buildings/${encodeURIComponent(key)}.json`, auth);
+  if (!building) {
+    return null;
+  }
+  // Byg en payload med én bygning, så kompakt format pakkes ud som ellers
+  const expanded = expandBuildingsPayload({
+    ...index.payload,
+    buildings: { [key]: building },
+  } as unknown as BuildingsPayload);
+  return expanded.buildings[key] ?? null;
+};
+
+// Hent den samlede payload; har den et indeks, bruges shards fra næste start
+const fetchFullPayload = async (
+  baseUrl: string,
+  auth: string | null,
+  cache: BuildingCache,
+): Promise<BuildingSource | null> => {
+  const data = (await fetchJson(`${baseUrl}.json`, auth)) as (BuildingsPayload & { index?: unknown }) | null;
+  // Basic validation: must have buildings key
+  if (!data || typeof data !== 'object' || !data.buildings) {
+    console.warn('Remote buildings payload invalid');
+    return null;
+  }
+  // Både det gamle format og --compact-formatet fra eksporten
+  const payload = expandBuildingsPayload(data);
+  saveSharded(cache, isIndex(data.index));
+  return {
+    buildings: Object.entries(payload.buildings).map(([key, building]) => ({
+      key,
+      originalName: building.originalName,
+    })),
+    index: null,
+    payload,
+  };
+};
+
+/**
+ * Hent bygningslisten ved opstart
+ *
+ * Med indeks hentes kun indekset, og bygningerne hentes siden med
+ * loadBuilding(); uden indeks hentes den samlede payload som før.
+ */
+export const fetchBuildingSource = async (baseUrl: string, auth: string | null): Promise<BuildingSource | null> => {
+  const cache = await loadCache();
+  if (cache.sharded === false) {
+    return fetchFullPayload(baseUrl, auth, cache);
+  }
+
+  let index: BuildingIndex | null;
+  try {
+    index = await fetchBuildingIndex(baseUrl, auth);
+  } catch (err) {
+    console.warn('Error fetching building index, falling back to full payload:', err);
+    return fetchFullPayload(baseUrl, auth, cache);
+  }
+  if (!index) {
+    return fetchFullPayload(baseUrl, auth, cache);
+  }
+
+  saveSharded(cache, true);
+  return {
+    buildings: Object.entries(index.buildings ?? {}).map(([key, entry]) => ({
+      key,
+      originalName: entry.originalName,
+    })),
+    index,
+    payload: null,
+  };
+};
+
+/**
+ * Hent én bygning, fra cachen hvis dens hash stadig passer med indekset
+ *
+ * Uden indeks slås bygningen op i den samlede payload.
+ */
+export const loadBuilding = async (
+  baseUrl: string,
+  auth: string | null,
+  source: BuildingSource,
+  key: string,
+): Promise<BuildingData | null> => {
+  const { index } = source;
+  if (!index) {
+    return source.payload?.buildings[key] ?? null;
+  }
+  const entry = index.buildings?.[key];
+  if (!entry) {
+    return null;
+  }
+
+  const name = buildingFileName(key);
+  const cached = await readJsonFile<CachedBuilding>(name);
+  if (cached?.version === CACHE_VERSION && cached.sha256 === entry.sha256 && cached.data) {
+    return cached.data;
+  }
+
+  const data = await fetchBuilding(baseUrl, auth, index, key);
+  if (data) {
+    writeJsonFile(name, { version: CACHE_VERSION, sha256: entry.sha256, data });
+  }
+  return data;
+};